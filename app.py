@@ -1,68 +1,74 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import simpleSplit
+import time
+
+# Marcado antes de qualquer import pesado, para medir o início a frio
+INICIO_PROCESSO = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 import threading
-import time
+import queue
 import sys
 import os
+import json
 import tempfile
+from collections import OrderedDict
 from datetime import datetime
 
-# =========================
-# LISTA DE CAPELAS
-# =========================
-CAPELAS = [
-    "CAPELA NOSSA SRA. DE FÁTIMA",
-    "CAPELA SAGRADO CORAÇÃO DE JESUS", 
-    "CAPELA SANT'ANNA",
-    "CAPELA SANTA CATARINA",   
-    "CAPELA SÃO JERÔNIMO",
-    "CAPELA SÃO JORGE",
-    "CAPELA SÃO JOSÉ",
-    "CAPELA S. SEBASTIÃO - MEIO DA SERRA",
-    "CAPELA SÃO SEBASTIAO RUA J",   
-    "MATRIZ",
-    "VAZIO"
-]
-
-# =========================
-# CONFIGURAÇÕES PIMACO 3x11
-# =========================
-MM = 2.83465 # Conversão 
+from reportlab.lib.pagesizes import A4
 
-ETIQUETA_LARGURA_CM = 6.35
-ETIQUETA_ALTURA_CM = 2.54
-COLUNAS = 3
-LINHAS = 11
+from etiquetas import (
+    CAPELAS, ETIQUETA_ALTURA, ETIQUETA_LARGURA, ETIQUETAS_POR_PAGINA, SLOTS,
+    GeracaoCancelada, analisar_linha_manual, aquecer, compactar,
+    estatisticas_cache, etiquetas_da_pagina, gerar_pdf, ler_excel_com_cache,
+    ler_manual, limpar_metricas, metricas, normalizar_comunidades,
+    renomear_comunidade, resumo_metricas, textos_pagina
+)
 
-MARGEM_ESQ_CM = 0.8
-MARGEM_SUP_CM = 0.9
-ESPACO_H_CM = 0.3
+# Intervalo com que a tela consulta o progresso da geração
+INTERVALO_ACOMPANHAMENTO_MS = 100
 
-ETIQUETA_LARGURA = ETIQUETA_LARGURA_CM * 10 * MM
-ETIQUETA_ALTURA = ETIQUETA_ALTURA_CM * 10 * MM
-MARGEM_ESQ = MARGEM_ESQ_CM * 10 * MM
-MARGEM_SUP = MARGEM_SUP_CM * 10 * MM
-ESPACO_H = ESPACO_H_CM * 10 * MM
+# Pausa na digitação antes de validar a entrada manual
+ATRASO_VALIDACAO_MS = 250
 
-# Variáveis globais para lazy loading
-pandas_loaded = False
+# Tempos de cada inicialização, para acompanhar regressões no início a frio
+ARQUIVO_LOG_INICIO = os.path.join(tempfile.gettempdir(), "gerador_etiquetas_inicio.jsonl")
 
 # Variáveis globais da interface
 entrada_excel = None
 texto_manual = None
+aviso_manual = None
+validacao_agendada = None
+linhas_validadas = []  # (texto, erro) de cada linha na última validação
 combo_capela = None
 modo = None
 status_label = None
 dados_atual = None
 frame_manual = None
 botao_procurar = None
+botao_gerar = None
+botao_cancelar = None
+botao_visualizar = None
+cancelamento = None
 root = None
 
 # =========================
 # TELA DE INÍCIO (com SPLASH SCREEN)
 # =========================
+def registrar_tempos_inicio(tempos, duracao_splash):
+    """Acrescenta os tempos de inicialização ao log, uma linha JSON por execução"""
+    registro = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "etapas": tempos,
+        "splash": round(duracao_splash, 4),
+        "total": round(time.perf_counter() - INICIO_PROCESSO, 4)
+    }
+    try:
+        with open(ARQUIVO_LOG_INICIO, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro) + "\n")
+    except OSError:
+        pass  # o log é só diagnóstico; não impede a abertura do sistema
+
 def mostrar_tela_inicio():
     """Mostra tela de início enquanto carrega o sistema"""
     
@@ -108,38 +114,42 @@ def mostrar_tela_inicio():
         largura = 300 * percentual / 100
         canvas.coords(progress_bar, 0, 0, largura, 4)
         status_text.set(texto)
-        splash.update()
     
     def carregar_sistema():
-        """Carrega o sistema em segundo plano"""
+        """Carrega o sistema em segundo plano (sem tocar nos widgets)"""
         try:
-            
-            atualizar_progresso(10, "Preparando ambiente...")
-            time.sleep(0.1)
-            
-          
-            atualizar_progresso(30, "Carregando módulos PDF...")
-          
-            atualizar_progresso(60, "Preparando interface...")
-            time.sleep(0.2)
-            
-           
-            atualizar_progresso(100, "Sistema pronto!")
-            time.sleep(0.3)
-            
-            # Fechar splash e abrir sistema principal
-            splash.after(0, lambda: (splash.destroy(), iniciar_sistema_principal()))
-            
+            tempos = aquecer(
+                progresso=lambda feitas, total, texto:
+                    mensagens.put(("progresso", 100 * feitas / total, texto))
+            )
+            mensagens.put(("fim", tempos))
         except Exception as e:
             print(f"Erro ao carregar: {e}")
-            splash.after(0, lambda: (
-                splash.destroy(),
-                messagebox.showerror("Erro", f"Falha ao iniciar sistema:\n{e}"),
+            mensagens.put(("erro", str(e)))
+
+    def acompanhar_carregamento():
+        """Atualiza o splash com o progresso real e fecha assim que terminar"""
+        while not mensagens.empty():
+            mensagem = mensagens.get_nowait()
+            if mensagem[0] == "progresso":
+                atualizar_progresso(mensagem[1], mensagem[2])
+            elif mensagem[0] == "fim":
+                registrar_tempos_inicio(mensagem[1], time.perf_counter() - inicio_splash)
+                # Fechar splash e abrir sistema principal
+                splash.destroy()
+                iniciar_sistema_principal()
+                return
+            else:
+                splash.destroy()
+                messagebox.showerror("Erro", f"Falha ao iniciar sistema:\n{mensagem[1]}")
                 sys.exit(1)
-            ))
-    
+        splash.after(INTERVALO_ACOMPANHAMENTO_MS // 2, acompanhar_carregamento)
+
     # Iniciar carregamento em thread separada
+    mensagens = queue.Queue()
+    inicio_splash = time.perf_counter()
     threading.Thread(target=carregar_sistema, daemon=True).start()
+    acompanhar_carregamento()
     
     # Permitir fechar com ESC
     splash.bind('<Escape>', lambda e: sys.exit())
@@ -147,272 +157,380 @@ def mostrar_tela_inicio():
     splash.mainloop()
 
 # =========================
-# LEITURA DO EXCEL (com lazy loading)
+# FUNÇÕES DA INTERFACE
 # =========================
-def ler_excel(caminho):
-    global pandas_loaded
-    if not pandas_loaded:
-        import pandas as pd
-        pandas_loaded = True
+def gerar(visualizar=False):
+    """Lê os campos da tela e inicia a geração (ou a prévia) em uma thread de trabalho"""
+    try:
+        if modo.get() == "excel":
+            caminho = entrada_excel.get().strip()
+            if not caminho:
+                raise Exception("Selecione um arquivo Excel.")
+            tarefa = ("excel", caminho)
+        else:
+            capela = combo_capela.get()
+            if not capela or capela == "VAZIO":
+                capela = "" 
+            tarefa = ("manual", texto_manual.get("1.0", tk.END), capela)
+    except Exception as e:
+        messagebox.showerror("Erro", str(e))
+        return
+
+    iniciar_trabalho(tarefa, visualizar)
+
+def visualizar():
+    gerar(visualizar=True)
+
+def iniciar_trabalho(tarefa, visualizar=False):
+    global cancelamento
+
+    # Evita iniciar duas gerações com cliques repetidos
+    botao_gerar.config(state="disabled")
+    botao_visualizar.config(state="disabled")
+    botao_cancelar.config(state="normal")
+    status_label.config(text="Processando...")
+
+    cancelamento = threading.Event()
+    mensagens = queue.Queue()
+    threading.Thread(
+        target=executar_geracao,
+        args=(tarefa, mensagens, cancelamento, visualizar),
+        daemon=True
+    ).start()
+    root.after(INTERVALO_ACOMPANHAMENTO_MS, acompanhar_geracao, mensagens, time.perf_counter())
+
+def ler_dados(tarefa, mensagens, cancelamento):
+    """Lê a planilha ou a entrada manual; retorna (dados, relatório das comunidades)"""
+    if tarefa[0] == "dados":
+        # Já lidos para a prévia
+        return tarefa[1], {}
+
+    if tarefa[0] == "excel":
+        dados = ler_excel_com_cache(
+            tarefa[1],
+            progresso=lambda linhas: mensagens.put(("leitura", linhas)),
+            cancelar=cancelamento
+        )
     else:
-        import pandas as pd
-    
-    df_bruto = pd.read_excel(caminho, header=None)
-
-    linha_cabecalho = None
-    for i in range(min(20, len(df_bruto))):  # Limita a busca
-        linha = df_bruto.iloc[i].astype(str).str.upper().tolist()
-        if any("NOME" in cel for cel in linha):
-            linha_cabecalho = i
-            break
-
-    if linha_cabecalho is None:
-        raise Exception("Cabeçalho com 'NOME' não encontrado.")
-
-    df = pd.read_excel(caminho, header=linha_cabecalho)
-    df.columns = [str(c).strip().upper() for c in df.columns]
-
-    col_nome = col_codigo = col_comunidade = None
-    for c in df.columns:
-        if "NOME" in c:
-            col_nome = c
-        if "CÓDIGO" in c:
-            col_codigo = c
-        if "COMUNIDADE" in c or "CAPELA" in c:
-            col_comunidade = c
-
-    if not all([col_nome, col_codigo, col_comunidade]):
-        raise Exception("Colunas obrigatórias não encontradas.")
-
-    df[col_nome] = df[col_nome].fillna("").astype(str).str.upper()
-    df[col_codigo] = (
-        df[col_codigo]
-        .fillna("")
-        .astype(str)
-        .str.replace(r"\.0$", "", regex=True)
-    )
-    df[col_comunidade] = df[col_comunidade].fillna("").astype(str).str.upper()
+        dados = ler_manual(tarefa[1], tarefa[2])
+
+    # Comunidades como categoria: menos memória e renomeação sem varrer as linhas
+    dados = compactar(dados)
+    if tarefa[0] != "excel":
+        return dados, {}
+
+    # Nomes digitados de formas diferentes viram a capela cadastrada
+    return normalizar_comunidades(dados, CAPELAS)
+
+def aviso_comunidades(relatorio):
+    """Resumo das comunidades corrigidas e das que ficaram sem capela"""
+    partes = []
+    corrigidas = relatorio.get("corrigidas")
+    if corrigidas:
+        partes.append(f"{len(corrigidas)} comunidade(s) corrigida(s): "
+                      + ", ".join(f"{valor} → {capela}" for valor, capela in sorted(corrigidas.items())))
+    sem_correspondencia = relatorio.get("sem_correspondencia")
+    if sem_correspondencia:
+        sugestoes = relatorio.get("sugestoes", {})
+        partes.append(f"{len(sem_correspondencia)} comunidade(s) sem capela cadastrada: "
+                      + ", ".join(
+                          f"{valor} (seria {sugestoes[valor]}?)" if valor in sugestoes else valor
+                          for valor in sorted(sem_correspondencia)
+                      ))
+    return " · ".join(partes)
+
+def executar_geracao(tarefa, mensagens, cancelamento, visualizar=False):
+    """
+    Roda fora da thread do Tk: lê os dados e gera o PDF (ou só os envia
+    para a prévia), enviando o progresso pela fila. Nunca toca nos widgets
+    diretamente.
+    """
+    limpar_metricas()  # o resumo mostra só as etapas deste trabalho
+    try:
+        dados, relatorio = ler_dados(tarefa, mensagens, cancelamento)
+        mensagens.put(("dados", dados))
+        if visualizar:
+            mensagens.put(("previa", dados, aviso_comunidades(relatorio)))
+            return
 
-    return df[[col_nome, col_codigo, col_comunidade]].rename(columns={
-        col_nome: "NOME",
-        col_codigo: "CÓDIGO DIZIMISTA",
-        col_comunidade: "COMUNIDADE"
-    })
+        acertos_antes = estatisticas_cache()["paginas"]["acertos"]
+        pdf_path = gerar_pdf(
+            dados,
+            progresso=lambda pagina, total: mensagens.put(("paginas", pagina, total)),
+            cancelar=cancelamento,
+            usar_cache_paginas=True
+        )
 
-# =========================
-# ENTRADA MANUAL
-# =========================
-def ler_manual(texto, capela):
-    linhas = texto.strip().splitlines()
-    registros = []
+        # Páginas iguais às da geração anterior não foram redesenhadas
+        reaproveitadas = estatisticas_cache()["paginas"]["acertos"] - acertos_antes
+        partes = []
+        aviso = aviso_comunidades(relatorio)
+        if aviso:
+            partes.append(aviso)
+        if reaproveitadas:
+            total = -(-len(dados) // ETIQUETAS_POR_PAGINA)
+            partes.append(f"{reaproveitadas} de {total} páginas reaproveitadas do cache")
+        # Vazio quando as métricas estão desligadas (ETIQUETAS_METRICAS)
+        resumo = resumo_metricas(metricas)
+        if resumo:
+            partes.append(resumo)
+        mensagens.put(("fim", pdf_path, " · ".join(partes)))
+    except GeracaoCancelada:
+        mensagens.put(("cancelado",))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()  # Para debug
+        mensagens.put(("erro", str(e)))
 
-    for numero_linha, linha in enumerate(linhas, start=1):
-        partes = [p.strip() for p in linha.split(";")]
-        
-        if len(partes) < 2:
-            continue
-        
-        elif len(partes) < 1:
-           raise Exception(f"Linha {numero_linha}: formato inválido.")
+def acompanhar_geracao(mensagens, inicio):
+    """Consome as mensagens da thread de trabalho e atualiza a tela"""
+    global dados_atual
 
+    texto = None
+    while True:
         try:
-            posicao = int(partes[0].strip())
-        except ValueError:
-            raise Exception(f"Linha {numero_linha}: Posicao deve ser um numero")    
-
-        if not(1 <= posicao <= 33):   
-           raise Exception(f"linha {numero_linha}: Posicao deve ser entre 1 e 33")
-        
-        nome = partes[1].strip().upper()
-
-        codigo = partes[2].strip() if len(partes) >= 3 else ""
-
-        registros.append({
-            "POSICAO": posicao,
-            "NOME": nome,
-            "CÓDIGO DIZIMISTA": codigo,
-            "COMUNIDADE": capela
-        })
-
-    if not registros:
-        raise Exception("Nenhuma linha válida encontrada.")
-
-    registros.sort(key=lambda x: x["POSICAO"])
-    posicao_inicial = registros[0]["POSICAO"]
-
-    dados = []
-
-    for _ in range(posicao_inicial - 1):
-        dados.append({
-            "NOME": "",
-            "CÓDIGO DIZIMISTA": "",
-            "COMUNIDADE": ""
-        })
-
-    for r in registros:
-        dados.append({
-            "NOME": r["NOME"],
-            "CÓDIGO DIZIMISTA": r["CÓDIGO DIZIMISTA"],
-            "COMUNIDADE": r["COMUNIDADE"]
-        })
-
-    # Importar pandas apenas quando necessário para otimizar 
-    global pandas_loaded
-    if not pandas_loaded:
-        import pandas as pd
-        pandas_loaded = True
-    else:
-        import pandas as pd
-    
-    return pd.DataFrame(dados)
+            mensagem = mensagens.get_nowait()
+        except queue.Empty:
+            break
 
-# =========================
-# GERAÇÃO DO PDF
-# =========================
-def gerar_pdf(dados):
-    try:
-        # Importação local para evitar o erro. Usuário tem salvado em locais indevido. 
-        from reportlab.pdfgen import canvas
-        
-        # Definir local de salvamento (Desktop ou pasta do usuário)
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-        documents_path = os.path.join(os.path.expanduser("~"), "Documents")
-        
-        # Verificar qual pasta está acessível
-        if os.access(desktop_path, os.W_OK):
-            save_dir = desktop_path
-        elif os.access(documents_path, os.W_OK):
-            save_dir = documents_path
+        tipo = mensagem[0]
+        if tipo == "leitura":
+            texto = f"Lendo planilha... {mensagem[1]} linhas"
+        elif tipo == "dados":
+            dados_atual = mensagem[1]
+        elif tipo == "paginas":
+            pagina, total = mensagem[1], mensagem[2]
+            decorrido = time.perf_counter() - inicio
+            if total:
+                restante = decorrido / pagina * (total - pagina)
+                texto = f"Gerando PDF... página {pagina} de {total} (faltam ~{restante:.0f} s)"
+            else:
+                texto = f"Gerando PDF... página {pagina}"
         else:
-            # Usar pasta temporária como último recurso
-            save_dir = tempfile.gettempdir()
-        
-        # Gerar nome de arquivo com timestamp para evitar conflitos
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_filename = f"etiquetas_{timestamp}.pdf"
-        pdf_path = os.path.join(save_dir, pdf_filename)
-        
-             
-        c = canvas.Canvas(pdf_path, pagesize=A4)
-        largura_pagina, altura_pagina = A4
-
-        x0 = MARGEM_ESQ
-        y0 = altura_pagina - MARGEM_SUP - ETIQUETA_ALTURA
-        x, y = x0, y0
-        contador = 0
-
-        for _, row in dados.iterrows():
-            nome = row["NOME"]
-            codigo = row["CÓDIGO DIZIMISTA"]
-            comunidade = row["COMUNIDADE"]
-
-            if not nome and not codigo and not comunidade:
-                contador += 1
-                x += ETIQUETA_LARGURA + ESPACO_H
+            finalizar_geracao()
+            if tipo == "fim":
+                if mensagem[2]:
+                    status_label.config(text=mensagem[2])
+                mostrar_pdf_gerado(mensagem[1])
+            elif tipo == "previa":
+                abrir_previa(mensagem[1], mensagem[2])
+            elif tipo == "cancelado":
+                status_label.config(text="Geração cancelada.")
             else:
-                linha_base = y + ETIQUETA_ALTURA - (6 * MM)
-
-                c.setFont("Helvetica-Bold", 14)
-                c.drawCentredString(x + ETIQUETA_LARGURA / 2, linha_base, f"Nº {codigo}")
-
-                c.setFont("Helvetica", 7.5)
-                c.drawCentredString(x + ETIQUETA_LARGURA / 2, linha_base - 10, comunidade)
-
-                c.setFont("Helvetica-Bold", 10.5)
-                linhas = simpleSplit(nome, "Helvetica-Bold", 10.5, ETIQUETA_LARGURA - 15)
-
-                for i, linha in enumerate(linhas[:2]):
-                    c.drawCentredString(
-                        x + ETIQUETA_LARGURA / 2,
-                        linha_base - 23 - (i * 11),
-                        linha
-                    )
-
-                contador += 1
-                x += ETIQUETA_LARGURA + ESPACO_H
-
-            if contador % COLUNAS == 0:
-                x = x0
-                y -= ETIQUETA_ALTURA
-
-            if contador % (COLUNAS * LINHAS) == 0:
-                c.showPage()
-                x, y = x0, y0
+                messagebox.showerror("Erro", mensagem[1])
+            return
 
-        c.save()
-        return pdf_path
+    if texto:
+        status_label.config(text=texto)
+    root.after(INTERVALO_ACOMPANHAMENTO_MS, acompanhar_geracao, mensagens, inicio)
+
+def agendar_validacao(event=None):
+    """Adia a validação da entrada manual até uma pausa na digitação"""
+    global validacao_agendada
+    texto_manual.edit_modified(False)
+    if validacao_agendada is not None:
+        root.after_cancel(validacao_agendada)
+    validacao_agendada = root.after(ATRASO_VALIDACAO_MS, validar_entrada_manual)
+
+def validar_entrada_manual():
+    """
+    Reanalisa só as linhas que mudaram desde a última validação e marca as
+    inválidas no próprio texto. As marcações acompanham o texto quando
+    linhas são inseridas ou apagadas, então as linhas iguais ficam como estão.
+    """
+    global validacao_agendada, linhas_validadas
+    validacao_agendada = None
+
+    linhas = texto_manual.get("1.0", "end-1c").split("\n")
+    validadas = []
+    erros = []
+    for numero, linha in enumerate(linhas, start=1):
+        if numero <= len(linhas_validadas) and linhas_validadas[numero - 1][0] == linha:
+            erro = linhas_validadas[numero - 1][1]
+        else:
+            resultado = analisar_linha_manual(linha)
+            erro = resultado if isinstance(resultado, str) else None
+            texto_manual.tag_remove("linha_invalida", f"{numero}.0", f"{numero}.end")
+            if erro:
+                texto_manual.tag_add("linha_invalida", f"{numero}.0", f"{numero}.end")
+
+        validadas.append((linha, erro))
+        if erro:
+            erros.append(f"Linha {numero}: {erro}")
+
+    linhas_validadas = validadas
+    if erros:
+        aviso_manual.config(text=f"{len(erros)} linha(s) com erro. {erros[0]}")
+    else:
+        aviso_manual.config(text="")
+
+def cancelar_geracao():
+    if cancelamento is not None:
+        cancelamento.set()
+        botao_cancelar.config(state="disabled")
+        status_label.config(text="Cancelando...")
+
+def finalizar_geracao():
+    global cancelamento
+    cancelamento = None
+    botao_gerar.config(state="normal")
+    botao_visualizar.config(state="normal")
+    botao_cancelar.config(state="disabled")
+    status_label.config(text="")
+
+def mostrar_pdf_gerado(pdf_path):
+    # Mostrar mensagem informando onde o arquivo foi salvo
+    desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+    if pdf_path.startswith(desktop_path):
+        local = "na Área de Trabalho"
+    elif "Documents" in pdf_path:
+        local = "na pasta Documentos"
+    elif "temp" in pdf_path.lower():
+        local = "na pasta temporária"
+    else:
+        local = f"em: {os.path.dirname(pdf_path)}"
         
-    except PermissionError as e:
-        raise Exception(f"Permissão negada para salvar o arquivo.\nTente fechar o arquivo PDF anterior ou escolher outra pasta.")
-    except Exception as e:
-        raise Exception(f"Erro ao gerar PDF: {str(e)}")
+    resposta = messagebox.askyesno(
+        "Sucesso", 
+        f"PDF gerado com sucesso!\n\n"
+        f"Arquivo salvo {local}:\n{os.path.basename(pdf_path)}\n\n"
+        f"Deseja abrir o arquivo?"
+    )
+    
+    if resposta:
+        try:
+            if sys.platform == "win32":
+                os.startfile(pdf_path)
+            elif sys.platform == "darwin":
+                os.system(f"open '{pdf_path}'")
+            else:
+                os.system(f"xdg-open '{pdf_path}'")
+        except:
+            messagebox.showinfo("Abrir Arquivo", 
+                f"Não foi possível abrir o arquivo automaticamente.\n"
+                f"Abra manualmente: {pdf_path}")
 
 # =========================
-# FUNÇÕES DA INTERFACE
+# PRÉVIA DAS PÁGINAS
 # =========================
-def gerar():
-    try:
-        global dados_atual
-        
-        # Mostrar mensagem de processamento
-        if status_label:
-            status_label.config(text="Processando...")
-        root.update()
-        
-        if modo.get() == "excel":
-            caminho = entrada_excel.get().strip()
-            if not caminho:
-                raise Exception("Selecione um arquivo Excel.")
-            dados = ler_excel(caminho)
-        else:
-            capela = combo_capela.get()
-            if not capela or capela == "VAZIO":
-                capela = "" 
-            dados = ler_manual(texto_manual.get("1.0", tk.END), capela)
+# Pixels por ponto do PDF, espaço entre as páginas e quantas páginas já
+# desenhadas continuam no Canvas depois de saírem da tela
+ESCALA_PREVIA = 0.8
+ESPACO_PAGINAS_PREVIA = 16
+PAGINAS_GUARDADAS_PREVIA = 12
+
+def abrir_previa(dados, aviso=""):
+    """
+    Mostra as páginas em um Canvas, com a geometria do PDF (SLOTS). Só as
+    páginas que entram na tela são desenhadas, e as vistas por último
+    ficam guardadas; por isso abrir a prévia não depende do tamanho da
+    lista. Nenhum PDF é gravado até o usuário confirmar.
+    """
+    largura_pagina, altura_pagina = A4
+    largura = largura_pagina * ESCALA_PREVIA
+    altura = altura_pagina * ESCALA_PREVIA
+    passo = altura + ESPACO_PAGINAS_PREVIA
+    margem = 10
+    total = max(1, -(-len(dados) // ETIQUETAS_POR_PAGINA))
 
-        dados_atual = dados
+    janela = tk.Toplevel(root)
+    janela.title(f"Prévia - {total} página(s)")
+    janela.geometry(f"{int(largura) + 2 * margem + 40}x720")
 
-        pdf_path = gerar_pdf(dados)
-        if status_label:
-            status_label.config(text="")
-        
-        # Mostrar mensagem informando onde o arquivo foi salvo
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-        if pdf_path.startswith(desktop_path):
-            local = "na Área de Trabalho"
-        elif "Documents" in pdf_path:
-            local = "na pasta Documentos"
-        elif "temp" in pdf_path.lower():
-            local = "na pasta temporária"
-        else:
-            local = f"em: {os.path.dirname(pdf_path)}"
-            
-        resposta = messagebox.askyesno(
-            "Sucesso", 
-            f"PDF gerado com sucesso!\n\n"
-            f"Arquivo salvo {local}:\n{os.path.basename(pdf_path)}\n\n"
-            f"Deseja abrir o arquivo?"
-        )
-        
-        if resposta:
-            try:
-                if sys.platform == "win32":
-                    os.startfile(pdf_path)
-                elif sys.platform == "darwin":
-                    os.system(f"open '{pdf_path}'")
-                else:
-                    os.system(f"xdg-open '{pdf_path}'")
-            except:
-                messagebox.showinfo("Abrir Arquivo", 
-                    f"Não foi possível abrir o arquivo automaticamente.\n"
-                    f"Abra manualmente: {pdf_path}")
+    topo = tk.Frame(janela)
+    topo.pack(fill="x", padx=10, pady=(8, 0))
+    tk.Label(
+        topo,
+        text=f"{len(dados)} etiquetas em {total} página(s). O PDF ainda não foi gravado."
+    ).pack(anchor="w")
+    if aviso:
+        tk.Label(topo, text=aviso, fg="red", justify="left",
+                 wraplength=int(largura)).pack(anchor="w")
+
+    quadro = tk.Frame(janela)
+    quadro.pack(fill="both", expand=True, padx=10, pady=8)
+    tela = tk.Canvas(quadro, bg="#808080", highlightthickness=0, yscrollincrement=20)
+    barra = tk.Scrollbar(quadro, orient="vertical", command=tela.yview)
+    barra.pack(side="right", fill="y")
+    tela.pack(side="left", fill="both", expand=True)
+    tela.configure(scrollregion=(0, 0, largura + 2 * margem, total * passo))
+
+    desenhadas = OrderedDict()  # páginas no Canvas, da vista há mais tempo à mais recente
+    fontes = {}
+
+    def fonte_tk(fonte):
+        if fonte not in fontes:
+            nome, tamanho = fonte
+            # Tamanho negativo: em pixels, na mesma escala da página
+            fontes[fonte] = ("Helvetica", -max(1, round(tamanho * ESCALA_PREVIA)),
+                             "bold" if "Bold" in nome else "normal")
+        return fontes[fonte]
+
+    def desenhar(pagina):
+        y0 = pagina * passo
+        marca = f"p{pagina}"
+
+        def ponto(x, y):
+            # PDF: origem embaixo à esquerda; Canvas: em cima à esquerda
+            return margem + x * ESCALA_PREVIA, y0 + (altura_pagina - y) * ESCALA_PREVIA
+
+        tela.create_rectangle(margem, y0, margem + largura, y0 + altura,
+                              fill="white", outline="", tags=marca)
+        for x, y, _, _ in SLOTS:
+            tela.create_rectangle(*ponto(x, y + ETIQUETA_ALTURA),
+                                  *ponto(x + ETIQUETA_LARGURA, y),
+                                  outline="#dddddd", tags=marca)
+        for x, y, texto, fonte in textos_pagina(etiquetas_da_pagina(dados, pagina)):
+            tela.create_text(*ponto(x, y), text=texto, font=fonte_tk(fonte),
+                             anchor="s", tags=marca)
+        tela.create_text(margem + largura, y0 + altura + 2, text=f"{pagina + 1}/{total}",
+                         anchor="ne", fill="white", font=("Arial", 8), tags=marca)
+
+    def atualizar(*_):
+        primeira = max(0, int(tela.canvasy(0) // passo))
+        ultima = min(total - 1, int(tela.canvasy(tela.winfo_height()) // passo))
+        for pagina in range(primeira, ultima + 1):
+            if pagina in desenhadas:
+                desenhadas.move_to_end(pagina)
+            else:
+                desenhar(pagina)
+                desenhadas[pagina] = True
+
+        while len(desenhadas) > PAGINAS_GUARDADAS_PREVIA:
+            antiga, _ = desenhadas.popitem(last=False)
+            tela.delete(f"p{antiga}")
+
+    def rolar(primeiro, ultimo):
+        barra.set(primeiro, ultimo)
+        atualizar()
+
+    def roda(event):
+        sentido = -1 if event.num == 4 or event.delta > 0 else 1
+        tela.yview_scroll(sentido * 3, "units")
+
+    tela.configure(yscrollcommand=rolar)
+    tela.bind("<Configure>", atualizar)
+    tela.bind("<MouseWheel>", roda)
+    tela.bind("<Button-4>", roda)
+    tela.bind("<Button-5>", roda)
+
+    def confirmar():
+        # Outra leitura ou geração começou depois que a prévia abriu
+        if cancelamento is not None:
+            messagebox.showwarning(
+                "Aguarde", "Já há uma geração em andamento. Tente de novo quando ela terminar.",
+                parent=janela
+            )
+            return
+        janela.destroy()
+        iniciar_trabalho(("dados", dados))
 
-    except Exception as e:
-        if status_label:
-            status_label.config(text="")
-        messagebox.showerror("Erro", str(e))
-        import traceback
-        traceback.print_exc()  # Para debug
+    rodape = tk.Frame(janela)
+    rodape.pack(pady=(0, 10))
+    tk.Button(rodape, text="GERAR PDF", font=("Arial", 10, "bold"), width=18,
+              command=confirmar).grid(row=0, column=0, padx=5)
+    tk.Button(rodape, text="Fechar", width=10,
+              command=janela.destroy).grid(row=0, column=1, padx=5)
 
 def abrir_crud_comunidades():
     indice_em_edicao = {"valor": None}
@@ -486,10 +604,7 @@ def abrir_crud_comunidades():
         
         global dados_atual
         if dados_atual is not None:
-                dados_atual.loc[
-                    dados_atual["COMUNIDADE"] == antigo_nome,
-                    "COMUNIDADE"
-                    ] = novo_nome
+            dados_atual = renomear_comunidade(dados_atual, antigo_nome, novo_nome)
                 
         indice_em_edicao["valor"] = None
         atualizar_listas()
@@ -531,7 +646,11 @@ def abrir_crud_comunidades():
     atualizar_listas()
 
 def selecionar_excel():
-    arquivo = filedialog.askopenfilename(filetypes=[("Excel", "*.xlsx *.xls")])
+    arquivo = filedialog.askopenfilename(filetypes=[
+        ("Excel ou CSV", "*.xlsx *.xls *.csv *.tsv *.txt"),
+        ("Excel", "*.xlsx *.xls"),
+        ("CSV", "*.csv *.tsv *.txt")
+    ])
     if arquivo:
         entrada_excel.delete(0, tk.END)
         entrada_excel.insert(0, arquivo)
@@ -556,8 +675,9 @@ def atualizar_modo():
 # INTERFACE PRINCIPAL
 # =========================
 def criar_interface():
-    global root, entrada_excel, texto_manual,\
-    combo_capela, modo, status_label, frame_manual, botao_procurar
+    global root, entrada_excel, texto_manual, aviso_manual,\
+    combo_capela, modo, status_label, frame_manual, botao_procurar,\
+    botao_gerar, botao_cancelar, botao_visualizar
 
     root = tk.Tk()
     root.title("Gerador de Etiquetas Pimaco")
@@ -635,18 +755,41 @@ def criar_interface():
 
     texto_manual = scrolledtext.ScrolledText(frame_manual, width=55, height=6)
     texto_manual.grid(row=1, column=0, sticky="ew")
+    texto_manual.tag_configure("linha_invalida", background="#ffd6d6")
+    texto_manual.bind("<<Modified>>", agendar_validacao)
+
+    aviso_manual = tk.Label(frame_manual, text="", fg="red", justify="left")
+    aviso_manual.grid(row=2, column=0, sticky="w")
 
     #acao principal:
     frame_acao = tk.Frame(container)
     frame_acao.grid(row=4, column=0, pady=15)
 
-    tk.Button(
+    botao_gerar = tk.Button(
         frame_acao,
         text="GERAR PDF",
         font=("Arial", 11, "bold"),
         width=25,
         command=gerar
-    ).grid(row=0, column=0)
+    )
+    botao_gerar.grid(row=0, column=0)
+
+    botao_visualizar = tk.Button(
+        frame_acao,
+        text="Visualizar",
+        width=10,
+        command=visualizar
+    )
+    botao_visualizar.grid(row=0, column=1, padx=(8, 0))
+
+    botao_cancelar = tk.Button(
+        frame_acao,
+        text="Cancelar",
+        width=10,
+        state="disabled",
+        command=cancelar_geracao
+    )
+    botao_cancelar.grid(row=0, column=2, padx=(8, 0))
 
     # status final:
         
@@ -0,0 +1,635 @@
+"""
+Benchmark da leitura do Excel e da geração do PDF.
+
+Gera uma planilha sintética no formato das listas da paróquia e compara:
+- a leitura antiga (pandas, duas passadas) com a leitura em passada única;
+- o pico de memória do PDF gerado a partir do DataFrame e do modo streaming;
+- o tempo de desenho do PDF para um DataFrame com o mesmo número de linhas;
+- tamanho e tempo do PDF com e sem formulários (Form XObjects) de comunidade;
+- a vazão de cada saída (PDF pelo ReportLab e ZPL em texto) em etiquetas/s;
+- bytes, páginas, arquivos e tempo de cada perfil de saída (compressão,
+  formulários e divisão em partes);
+- o início a frio do núcleo (etiquetas.py) com o tkinter bloqueado;
+- a latência de uma folha manual de 33 etiquetas (do clique ao PDF) em um
+  interpretador novo, com Etiqueta e com o antigo DataFrame;
+- a memória do DataFrame com comunidades em texto e categóricas, e o tempo
+  de renomear uma comunidade em cada representação;
+- a normalização das comunidades contra CAPELAS (só valores distintos);
+- a deduplicação por código e a ordenação por comunidade e código;
+- a segunda leitura da mesma planilha pelo cache em disco.
+
+Com --carga URL, dispara pedidos simultâneos contra o serviço HTTP
+(servidor.py) e informa pedidos por segundo, latências p50/p95 e quantos
+foram recusados por excesso de carga (503).
+
+Com --suite, roda a suíte reprodutível: listas sintéticas de 1 mil a
+1 milhão de linhas (nomes longos e acentuados, cabeçalho deslocado por
+linhas de título, colunas extras e muitos slots vazios), com o tempo de
+cada etapa, o tempo de ponta a ponta, o pico de memória e o tamanho do
+PDF. Cada lista é medida várias vezes, cada vez em um interpretador novo,
+e vale o menor valor de cada métrica: o ruído da máquina só aumenta os
+tempos. Os resultados podem ser gravados como linha de base e comparados
+com ela; acima do limite de regressão, o comando termina com erro.
+A linha de base é local: tempos só se comparam na mesma máquina, por
+isso benchmark_base.json não vai para o repositório.
+Não usa rede nem tela.
+
+Uso:
+    python benchmark.py [linhas]
+    python benchmark.py --suite [--tamanhos 1000,10000] [--repeticoes 3] [--gravar-base]
+    python benchmark.py --suite --base benchmark_base.json --limite 0.2
+    python benchmark.py --carga http://127.0.0.1:8765 [--requisicoes 200] [--concorrencia 8]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import etiquetas
+from etiquetas import (
+    CAPELAS, PERFIS_SAIDA, _ler_excel_pandas, compactar, estatisticas_cache, gerar_pdf,
+    gerar_pdf_perfil, gerar_zpl, limpar_cache_paginas,
+    deduplicar_e_ordenar, ler_excel, ler_excel_com_cache, ler_excel_streaming, ler_manual,
+    normalizar_comunidades, renomear_comunidade
+)
+
+
+TAMANHOS_SUITE = (1000, 10000, 100000, 1000000)
+ARQUIVO_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_base.json")
+LIMITE_REGRESSAO = 0.2   # 20% mais lento, maior ou mais pesado
+TEMPO_MINIMO = 0.25      # etapas mais curtas (s) variam demais para comparar
+REPETICOES_SUITE = 3     # medidas de cada lista; vale a menor
+SEMENTE = 2024
+LINHAS_CARGA = 330       # 10 folhas por pedido no teste de carga
+
+
+def gerar_planilha(caminho, linhas):
+    """Cria uma planilha com título, cabeçalho e colunas extras"""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["LISTA DE DIZIMISTAS"])
+    ws.append([])
+    ws.append(["Nome", "Código dizimista", "Comunidade", "Telefone", "Endereço"])
+    for i in range(linhas):
+        ws.append([
+            f"JOSÉ DA CONCEIÇÃO {i}",
+            float(1000 + i),
+            CAPELAS[i % len(CAPELAS)],
+            f"(24) 9{i:08d}",
+            f"RUA {i % 300}, {i}",
+        ])
+    wb.save(caminho)
+
+
+def gerar_dados(linhas):
+    """Cria um DataFrame de etiquetas, com um slot vazio a cada nove"""
+    import pandas as pd
+
+    registros = [
+        ("", "", "") if i % 9 == 0 else
+        (f"JOSÉ DA CONCEIÇÃO {i}", str(1000 + i), CAPELAS[i % len(CAPELAS)])
+        for i in range(linhas)
+    ]
+    return pd.DataFrame(registros, columns=["NOME", "CÓDIGO DIZIMISTA", "COMUNIDADE"])
+
+
+def medir(funcao, caminho, repeticoes=3):
+    """Retorna o menor tempo de execução e o resultado"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(caminho)
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor, resultado
+
+
+def pico_memoria(funcao):
+    """Executa a função e retorna (pico de memória em MB, resultado)"""
+    tracemalloc.start()
+    try:
+        resultado = funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / (1024 * 1024), resultado
+
+
+def inicio_a_frio(repeticoes=5):
+    """
+    Importa o núcleo em um interpretador novo com o tkinter bloqueado e
+    retorna o menor tempo. Que ele importa sem a interface é conferido em
+    tests/test_nucleo.py; aqui só se mede.
+    """
+    codigo = (
+        "import sys, time; sys.modules['tkinter'] = None; "
+        "t = time.perf_counter(); import etiquetas; "
+        "print(time.perf_counter() - t)"
+    )
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    tempos = [
+        float(subprocess.run(
+            [sys.executable, "-c", codigo], cwd=pasta,
+            capture_output=True, text=True, check=True
+        ).stdout)
+        for _ in range(repeticoes)
+    ]
+    return min(tempos)
+
+
+def latencia_manual(com_dataframe=False, repeticoes=5):
+    """
+    Mede, em um interpretador novo, o tempo de ler_manual + gerar_pdf para
+    uma folha completa. Com com_dataframe, converte para DataFrame antes,
+    como a entrada manual fazia. Retorna (menor tempo, pandas foi importado).
+    """
+    codigo = (
+        "import sys, time, os; sys.modules['tkinter'] = None; "
+        "t = time.perf_counter(); import etiquetas; "
+        "texto = '\\n'.join(f'{i}; NOME {i}; {i}' for i in range(1, 34)); "
+        "dados = etiquetas.ler_manual(texto, 'MATRIZ'); "
+        f"dados = etiquetas.para_dataframe(dados) if {com_dataframe} else dados; "
+        "os.remove(etiquetas.gerar_pdf(dados, pdf_path=sys.argv[1])); "
+        "print(time.perf_counter() - t, 'pandas' in sys.modules)"
+    )
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    resultados = []
+    with tempfile.TemporaryDirectory() as saida:
+        for _ in range(repeticoes):
+            tempo, pandas = subprocess.run(
+                [sys.executable, "-c", codigo, os.path.join(saida, "manual.pdf")],
+                cwd=pasta, capture_output=True, text=True, check=True
+            ).stdout.split()
+            resultados.append((float(tempo), pandas == "True"))
+    return min(resultados)
+
+
+def memoria_compacta(dados):
+    """
+    Compara memória (MB) e tempo de renomear uma comunidade entre o
+    DataFrame com texto e o compacto (categórico).
+    """
+    compacto = compactar(dados)
+    resultado = {}
+    for rotulo, df in (("texto", dados.copy()), ("categórica", compacto)):
+        memoria = df.memory_usage(deep=True).sum() / (1024 * 1024)
+        inicio = time.perf_counter()
+        renomear_comunidade(df, CAPELAS[0], "COMUNIDADE RENOMEADA")
+        resultado[rotulo] = (memoria, time.perf_counter() - inicio)
+    return resultado
+
+
+PRENOMES = [
+    "JOSÉ", "MARIA", "ANTÔNIO", "CONCEIÇÃO", "JOÃO", "SEBASTIÃO", "INÊS",
+    "ANA LÚCIA", "CLÁUDIO", "FÁTIMA", "JOAQUIM", "TEREZINHA", "ÂNGELA"
+]
+SOBRENOMES = [
+    "DA CONCEIÇÃO", "GONÇALVES", "DE ASSUNÇÃO", "ARAÚJO", "MAGALHÃES",
+    "DOS SANTOS", "BRANDÃO", "DE JESUS", "SIMÕES", "FALCÃO", "GUIMARÃES",
+    "DA ANUNCIAÇÃO", "PIMENTEL", "CORRÊA"
+]
+CABECALHOS = [
+    ["Nome", "Código dizimista", "Comunidade"],
+    ["Nº", "NOME DO DIZIMISTA", "CÓDIGO", "Telefone", "Capela"],
+    ["Telefone", " nome completo ", "Endereço", "Código Dizimista", "CAPELA/COMUNIDADE"],
+]
+
+
+def gerar_lista_sintetica(caminho, linhas, semente=SEMENTE):
+    """
+    Cria uma lista realista e reprodutível: linhas de título antes do
+    cabeçalho, colunas extras em posições variadas, nomes longos com
+    acentos, códigos como número ou texto e cerca de 15% de slots vazios.
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(semente * 7919 + linhas)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    for _ in range(rng.randint(0, 6)):
+        ws.append(rng.choice([
+            ["PARÓQUIA SÃO SEBASTIÃO - LISTA DE DIZIMISTAS"],
+            [],
+            ["Emitido em", "01/10/2026"],
+        ]))
+
+    cabecalho = rng.choice(CABECALHOS)
+    ws.append(cabecalho)
+    # Qual valor vai em cada coluna (None para as colunas extras)
+    chaves = []
+    for coluna in (c.strip().upper() for c in cabecalho):
+        if "CAPELA" in coluna:
+            coluna = "COMUNIDADE"
+        chaves.append(next((k for k in ("NOME", "CÓDIGO", "COMUNIDADE") if k in coluna), None))
+
+    for i in range(linhas):
+        if rng.random() < 0.15:
+            ws.append([])
+            continue
+
+        nome = " ".join(
+            [rng.choice(PRENOMES)] + rng.sample(SOBRENOMES, rng.randint(2, 5))
+        )
+        codigo = 1000 + i
+        valores = {
+            "NOME": nome if rng.random() < 0.5 else nome.title(),
+            "CÓDIGO": rng.choice((codigo, float(codigo), str(codigo))),
+            "COMUNIDADE": rng.choice(CAPELAS),
+        }
+        ws.append([valores[chave] if chave else f"extra {i}" for chave in chaves])
+
+    wb.save(caminho)
+
+
+def texto_manual_sintetico(semente=SEMENTE):
+    """Folha manual com posições esparsas (slots vazios entre elas)"""
+    rng = random.Random(semente)
+    posicoes = sorted(rng.sample(range(1, 34), 20))
+    return "\n".join(
+        f"{p}; {rng.choice(PRENOMES)} {' '.join(rng.sample(SOBRENOMES, 3))}; {1000 + p}"
+        for p in posicoes
+    )
+
+
+def _etapas(medidas):
+    """{"etapa" ou "etapa/subetapa": segundos} a partir das métricas do núcleo"""
+    return {
+        (f"{m['dentro_de']}/{m['etapa']}" if m["dentro_de"] else m["etapa"]): m["segundos"]
+        for m in medidas
+    }
+
+
+def medir_entrada(caminho, semente=SEMENTE):
+    """
+    Executado em um interpretador novo (--medir): lê a lista (ou a folha
+    manual, com caminho "manual") e gera o PDF, medindo cada etapa só pelo
+    tempo. O pico de memória é o RSS máximo do processo, que não desacelera
+    a medição como o tracemalloc.
+    """
+    import resource
+
+    etiquetas.ativar_metricas(
+        os.path.join(tempfile.gettempdir(), "benchmark_metricas.jsonl"), memoria=False
+    )
+    etiquetas.aquecer()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        inicio = time.perf_counter()
+        if caminho == "manual":
+            dados = ler_manual(texto_manual_sintetico(semente), "MATRIZ")
+        else:
+            dados = compactar(ler_excel(caminho))
+        pdf = gerar_pdf(dados, pdf_path=os.path.join(pasta, "saida.pdf"))
+        ponta_a_ponta = time.perf_counter() - inicio
+        tamanho_pdf = os.path.getsize(pdf)
+
+    gerar = next(m for m in etiquetas.metricas if m["etapa"] == "gerar_pdf")
+    return {
+        "etapas": _etapas(etiquetas.metricas),
+        "ponta_a_ponta": round(ponta_a_ponta, 4),
+        # ru_maxrss vem em KB no Linux
+        "pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pdf_kb": round(tamanho_pdf / 1024, 1),
+        "paginas": gerar["paginas"]
+    }
+
+
+def _medir_em_processo_novo(caminho, semente):
+    """Roda medir_entrada em outro interpretador, isolando memória e caches"""
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--medir", caminho,
+         "--semente", str(semente)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(saida)
+
+
+def _menor_medida(medidas):
+    """Combina as repetições de uma lista ficando com o menor valor de cada métrica"""
+    etapas = {
+        nome: min(m["etapas"][nome] for m in medidas)
+        for nome in medidas[0]["etapas"]
+        if all(nome in m["etapas"] for m in medidas)
+    }
+    return {
+        "etapas": etapas,
+        "ponta_a_ponta": min(m["ponta_a_ponta"] for m in medidas),
+        "pico_mb": min(m["pico_mb"] for m in medidas),
+        "pdf_kb": medidas[0]["pdf_kb"],
+        "paginas": medidas[0]["paginas"],
+        "repeticoes": len(medidas)
+    }
+
+
+def _medir_varias_vezes(caminho, semente, repeticoes):
+    return _menor_medida([_medir_em_processo_novo(caminho, semente) for _ in range(repeticoes)])
+
+
+def rodar_suite(tamanhos, semente=SEMENTE, repeticoes=REPETICOES_SUITE):
+    """
+    Gera as listas sintéticas e mede cada uma (e a folha manual) repeticoes
+    vezes, cada vez em um interpretador novo com os módulos já carregados.
+    """
+    resultados = {"manual": _medir_varias_vezes("manual", semente, repeticoes)}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in tamanhos:
+            caminho = os.path.join(pasta, f"lista_{linhas}.xlsx")
+            print(f"Gerando lista de {linhas} linhas...", file=sys.stderr)
+            gerar_lista_sintetica(caminho, linhas, semente)
+            print(f"Medindo lista de {linhas} linhas...", file=sys.stderr)
+            resultados[str(linhas)] = _medir_varias_vezes(caminho, semente, repeticoes)
+            os.remove(caminho)
+
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semente": semente,
+        "resultados": resultados
+    }
+
+
+def _valores_comparaveis(resultado):
+    """Achata um resultado em {métrica: valor} para a comparação"""
+    valores = {f"tempo {k}": v for k, v in resultado["etapas"].items()}
+    valores["tempo ponta a ponta"] = resultado["ponta_a_ponta"]
+    valores["pico de memória (MB)"] = resultado["pico_mb"]
+    valores["PDF (KB)"] = resultado["pdf_kb"]
+    return valores
+
+
+def comparar(atual, base, limite=LIMITE_REGRESSAO):
+    """Lista as regressões: métricas que pioraram mais que o limite"""
+    regressoes = []
+    for tamanho, resultado in atual["resultados"].items():
+        if tamanho not in base["resultados"]:
+            continue
+        antes = _valores_comparaveis(base["resultados"][tamanho])
+        for metrica, valor in _valores_comparaveis(resultado).items():
+            anterior = antes.get(metrica)
+            if anterior is None or (metrica.startswith("tempo") and anterior < TEMPO_MINIMO):
+                continue
+            if anterior > 0 and valor > anterior * (1 + limite):
+                regressoes.append((tamanho, metrica, anterior, valor))
+    return regressoes
+
+
+def imprimir_suite(atual):
+    for tamanho, resultado in atual["resultados"].items():
+        rotulo = "Folha manual" if tamanho == "manual" else f"{int(tamanho):,} linhas".replace(",", ".")
+        print(f"{rotulo}: {resultado['paginas']} páginas, PDF {resultado['pdf_kb']:.0f} KB, "
+              f"pico {resultado['pico_mb']:.1f} MB")
+        print(f"  {'ponta a ponta':<27}{resultado['ponta_a_ponta']:.3f} s")
+        for nome, segundos in resultado["etapas"].items():
+            print(f"  {nome:<27}{segundos:.3f} s")
+
+
+def main_suite(args):
+    tamanhos = [int(t) for t in args.tamanhos.split(",")] if args.tamanhos else TAMANHOS_SUITE
+    atual = rodar_suite(tamanhos, args.semente, args.repeticoes)
+    imprimir_suite(atual)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(atual, f, ensure_ascii=False, indent=2)
+
+    if args.gravar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(atual, f, ensure_ascii=False, indent=2)
+        print(f"Linha de base gravada em {args.base}")
+        return 0
+
+    if not os.path.exists(args.base):
+        print(f"Sem linha de base em {args.base} (use --gravar-base).")
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("plataforma") != atual["plataforma"]:
+        print(f"Aviso: a linha de base foi gravada em outra máquina ({base.get('plataforma')}); "
+              f"os tempos podem não ser comparáveis.")
+    regressoes = comparar(atual, base, args.limite)
+    for tamanho, metrica, anterior, valor in regressoes:
+        print(f"REGRESSÃO [{tamanho}] {metrica}: {anterior} -> {valor} "
+              f"(+{(valor / anterior - 1) * 100:.0f}%)")
+    if regressoes:
+        return 1
+    print(f"Sem regressões acima de {args.limite * 100:.0f}% em relação a {args.base}.")
+    return 0
+
+
+def _percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fracao))]
+
+
+def _enviar(url, corpo, tipo):
+    pedido = urllib.request.Request(url, data=corpo, headers={"Content-Type": tipo})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(pedido, timeout=600) as resposta:
+            resposta.read()
+            codigo = resposta.status
+    except urllib.error.HTTPError as e:
+        codigo = e.code
+    except OSError:
+        codigo = None
+    return codigo, time.perf_counter() - inicio
+
+
+def main_carga(args):
+    url = args.carga.rstrip("/") + "/etiquetas"
+    tipo = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    if args.planilha:
+        with open(args.planilha, "rb") as f:
+            corpo = f.read()
+        if args.planilha.lower().endswith((".csv", ".tsv", ".txt")):
+            url += "?formato=" + ("tsv" if args.planilha.lower().endswith(".tsv") else "csv")
+    else:
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "lista.xlsx")
+            gerar_lista_sintetica(caminho, LINHAS_CARGA, args.semente)
+            with open(caminho, "rb") as f:
+                corpo = f.read()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        resultados = list(executor.map(
+            lambda _: _enviar(url, corpo, tipo), range(args.requisicoes)
+        ))
+    total = time.perf_counter() - inicio
+
+    latencias = [segundos for codigo, segundos in resultados if codigo == 200]
+    recusados = sum(1 for codigo, _ in resultados if codigo == 503)
+    erros = len(resultados) - len(latencias) - recusados
+
+    print(f"Pedidos: {args.requisicoes} ({args.concorrencia} simultâneos), "
+          f"corpo de {len(corpo) / 1024:.0f} KB")
+    print(f"Atendidos: {len(latencias)}  Recusados (503): {recusados}  Erros: {erros}")
+    print(f"Vazão: {len(latencias) / total:.1f} pedidos/s em {total:.2f} s")
+    if latencias:
+        print(f"Latência p50: {_percentil(latencias, 0.50) * 1000:.0f} ms  "
+              f"p95: {_percentil(latencias, 0.95) * 1000:.0f} ms  "
+              f"máx: {max(latencias) * 1000:.0f} ms")
+    return 1 if erros else 0
+
+
+def main_comparacao(linhas):
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "lista.xlsx")
+        gerar_planilha(caminho, linhas)
+
+        t_antigo, df_antigo = medir(_ler_excel_pandas, caminho)
+        t_novo, df_novo = medir(ler_excel, caminho)
+
+        pasta_cache = os.path.join(pasta, "cache")
+        ler_excel_com_cache(caminho, pasta_cache)
+        t_cache, df_cache = medir(lambda c: ler_excel_com_cache(c, pasta_cache), caminho)
+
+        # Cada medida desenha as páginas do zero, sem o cache da anterior
+        pdf_path = os.path.join(pasta, "etiquetas.pdf")
+        limpar_cache_paginas()
+        mem_df, _ = pico_memoria(lambda: gerar_pdf(ler_excel(caminho), pdf_path=pdf_path))
+        limpar_cache_paginas()
+        mem_stream, _ = pico_memoria(
+            lambda: gerar_pdf(ler_excel_streaming(caminho), pdf_path=pdf_path)
+        )
+
+        dados = gerar_dados(linhas)
+        formularios = {}
+        for usar_formularios in (False, True):
+            limpar_cache_paginas()
+            inicio = time.perf_counter()
+            gerar_pdf(dados, pdf_path=pdf_path, usar_formularios=usar_formularios)
+            formularios[usar_formularios] = (time.perf_counter() - inicio, os.path.getsize(pdf_path))
+        t_pdf = formularios[False][0]
+
+        perfis = {}
+        for perfil in PERFIS_SAIDA:
+            limpar_cache_paginas()
+            perfis[perfil] = gerar_pdf_perfil(dados, os.path.join(pasta, f"{perfil}.pdf"), perfil)
+
+    saida_zpl = io.BytesIO()
+    inicio = time.perf_counter()
+    gerar_zpl(dados, saida_zpl)
+    t_zpl = time.perf_counter() - inicio
+
+    if not (df_antigo.equals(df_novo) and df_novo.equals(df_cache)):
+        raise SystemExit("ERRO: os resultados das leituras são diferentes.")
+
+    print(f"Linhas: {linhas}")
+    print(f"Leitura pandas (2 passadas): {t_antigo:.3f} s")
+    print(f"Leitura passada única:       {t_novo:.3f} s")
+    print(f"Ganho: {t_antigo / t_novo:.1f}x")
+    print(f"Leitura pelo cache:          {t_cache:.3f} s")
+    print(f"Pico de memória (DataFrame): {mem_df:.1f} MB")
+    print(f"Pico de memória (streaming): {mem_stream:.1f} MB")
+    print(f"Geração do PDF:              {t_pdf:.3f} s")
+
+    t_form, tamanho_form = formularios[True]
+    print(f"PDF sem formulários: {formularios[False][1] / 1024:.0f} KB")
+    print(f"PDF com formulários: {tamanho_form / 1024:.0f} KB em {t_form:.3f} s")
+
+    preenchidas = int(((dados["NOME"] != "") | (dados["CÓDIGO DIZIMISTA"] != "")
+                       | (dados["COMUNIDADE"] != "")).sum())
+    for perfil, relatorio in perfis.items():
+        print(f"{'Perfil ' + perfil + ':':<29}{relatorio['bytes'] / 1024:.0f} KB, "
+              f"{relatorio['paginas']} páginas, {len(relatorio['arquivos'])} arquivo(s), "
+              f"{relatorio['segundos']:.3f} s")
+
+    print(f"Vazão PDF (ReportLab):       {preenchidas / t_pdf:,.0f} etiquetas/s")
+    print(f"Vazão ZPL (texto):           {preenchidas / t_zpl:,.0f} etiquetas/s "
+          f"({t_pdf / t_zpl:.0f}x, {len(saida_zpl.getvalue()) / 1024:.0f} KB)")
+
+    print(f"Início a frio do núcleo:     {inicio_a_frio() * 1000:.0f} ms (sem tkinter)")
+
+    for com_dataframe in (True, False):
+        tempo, pandas = latencia_manual(com_dataframe)
+        rotulo = "DataFrame" if com_dataframe else "Etiqueta"
+        print(f"{'Folha manual (' + rotulo + '):':<29}{tempo * 1000:.0f} ms"
+              f"{' (importa pandas)' if pandas else ''}")
+
+    for rotulo, (memoria, tempo) in memoria_compacta(dados).items():
+        print(f"{'Comunidade ' + rotulo + ':':<29}{memoria:.1f} MB, "
+              f"renomear em {tempo * 1000:.2f} ms")
+
+    compacto = compactar(dados)
+    inicio = time.perf_counter()
+    normalizar_comunidades(compacto)
+    print(f"{'Normalizar comunidades:':<29}{(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+    # A mesma lista duas vezes, como ao juntar listas de comunidades
+    import pandas as pd
+    juntas = pd.concat([compacto, compacto], ignore_index=True)
+    inicio = time.perf_counter()
+    unicas, relatorio = deduplicar_e_ordenar(juntas, ordem="codigo")
+    print(f"{'Deduplicar e ordenar:':<29}{(time.perf_counter() - inicio) * 1000:.0f} ms "
+          f"({len(juntas)} -> {len(unicas)} linhas, {relatorio['removidas']} repetidas)")
+
+    cache = estatisticas_cache()
+    for nome in ("quebra", "largura"):
+        print(f"Cache de {nome}: {cache[nome]['acertos']} acertos, "
+              f"{cache[nome]['falhas']} falhas")
+    print(f"Trocas de fonte: {cache['fontes']['feitas']} feitas, "
+          f"{cache['fontes']['evitadas']} evitadas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da leitura e da geração do PDF.")
+    parser.add_argument("linhas", nargs="?", type=int, default=40000,
+                        help="linhas da planilha na comparação simples (padrão: 40000)")
+    parser.add_argument("--suite", action="store_true",
+                        help="roda a suíte com listas sintéticas de vários tamanhos")
+    parser.add_argument("--tamanhos", help="tamanhos da suíte separados por vírgula "
+                        "(padrão: 1000,10000,100000,1000000)")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_SUITE,
+                        help="medidas de cada lista na suíte; vale a menor (padrão: 3)")
+    parser.add_argument("--base", default=ARQUIVO_BASE,
+                        help="arquivo JSON da linha de base, local a esta máquina "
+                        "(padrão: benchmark_base.json)")
+    parser.add_argument("--gravar-base", action="store_true",
+                        help="grava os resultados como nova linha de base")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO,
+                        help="piora tolerada antes de acusar regressão (padrão: 0.2 = 20%%)")
+    parser.add_argument("--saida", help="grava também os resultados neste arquivo JSON")
+    parser.add_argument("--semente", type=int, default=SEMENTE,
+                        help="semente das listas sintéticas")
+    parser.add_argument("--carga", metavar="URL",
+                        help="teste de carga contra o serviço HTTP (servidor.py)")
+    parser.add_argument("--requisicoes", type=int, default=100,
+                        help="pedidos do teste de carga (padrão: 100)")
+    parser.add_argument("--concorrencia", type=int, default=8,
+                        help="pedidos simultâneos do teste de carga (padrão: 8)")
+    parser.add_argument("--planilha", help="arquivo enviado no teste de carga "
+                        f"(padrão: lista sintética de {LINHAS_CARGA} linhas)")
+    parser.add_argument("--medir", metavar="PLANILHA", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.medir:
+        print(json.dumps(medir_entrada(args.medir, args.semente)))
+        return 0
+    if args.carga:
+        return main_carga(args)
+    if args.suite:
+        return main_suite(args)
+    main_comparacao(args.linhas)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
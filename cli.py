@@ -0,0 +1,199 @@
+"""
+Linha de comando do gerador de etiquetas, sem interface gráfica.
+
+Exemplos:
+    python cli.py lista.xlsx -o etiquetas.pdf
+    python cli.py --manual entrada.txt --capela "MATRIZ" -o etiquetas.pdf
+    python cli.py lista.xlsx --por-comunidade pasta_saida
+    python cli.py juntas.csv --deduplicar --ordenar codigo -o etiquetas.pdf
+    python cli.py lista.xlsx --perfil grafica -o etiquetas.pdf
+    python cli.py lista.xlsx --perfil compacto --paginas-por-arquivo 200
+    python cli.py lista.xlsx --zpl -o etiquetas.zpl
+    python cli.py lista.xlsx --impressora 192.168.0.50
+    python cli.py recebidos/ --lote -o pasta_saida
+    python cli.py "recebidos/*.xlsx" --lote --por-origem -o pasta_saida
+"""
+import argparse
+import sys
+import time
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Gera etiquetas Pimaco 3x11 em PDF a partir de uma planilha ou de entrada manual."
+    )
+    parser.add_argument("entrada", nargs="?", help="planilha Excel (.xlsx ou .xls) ou CSV/TSV")
+    parser.add_argument("-o", "--saida",
+                        help="arquivo PDF de saída (padrão: Área de Trabalho); com --lote, a pasta de saída")
+    parser.add_argument("--manual", metavar="ARQUIVO",
+                        help="arquivo texto no formato da entrada manual (Posição;NOME;Código)")
+    parser.add_argument("--capela", default="",
+                        help="comunidade impressa nas etiquetas da entrada manual")
+    parser.add_argument("--streaming", action="store_true",
+                        help="lê a planilha linha a linha, sem montar um DataFrame")
+    parser.add_argument("--por-comunidade", metavar="PASTA",
+                        help="gera um PDF por comunidade na pasta, com manifesto.json")
+    parser.add_argument("--lote", action="store_true",
+                        help="a entrada é uma pasta ou padrão glob: lê todas as abas com cabeçalho NOME")
+    parser.add_argument("--por-origem", action="store_true",
+                        help="com --lote, gera um PDF por aba em vez de um único PDF")
+    parser.add_argument("--processos", type=int,
+                        help="processos usados na geração paralela")
+    parser.add_argument("--sem-cache", action="store_true",
+                        help="não usa nem grava o cache de planilhas já lidas")
+    parser.add_argument("--formularios", action="store_true",
+                        help="desenha a linha da comunidade como formulário reutilizável")
+    parser.add_argument("--perfil", metavar="NOME",
+                        help="perfil de saída: padrao, rapido, compacto, sem_compressao ou grafica")
+    parser.add_argument("--paginas-por-arquivo", type=int, metavar="N",
+                        help="divide o PDF em arquivos de N páginas (nome_parte001.pdf, ...)")
+    parser.add_argument("--zpl", action="store_true",
+                        help="gera ZPL para impressora térmica em vez de PDF (-o - escreve na saída padrão)")
+    parser.add_argument("--impressora", metavar="HOST[:PORTA]",
+                        help="envia o ZPL direto para a impressora de rede (porta padrão: 9100)")
+    parser.add_argument("--normalizar-comunidades", action="store_true",
+                        help="troca os nomes de comunidade da planilha pelas capelas cadastradas")
+    parser.add_argument("--deduplicar", action="store_true",
+                        help="imprime uma única etiqueta por código de dizimista (avisa nomes diferentes)")
+    parser.add_argument("--ordenar", choices=("codigo", "nome"),
+                        help="ordena por comunidade e depois por código ou nome")
+    parser.add_argument("--metricas", nargs="?", const="", metavar="ARQUIVO",
+                        help="grava tempo e memória de cada etapa em JSON lines "
+                             "(padrão: gerador_etiquetas_metricas.jsonl na pasta temporária)")
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+
+    if bool(args.entrada) == bool(args.manual):
+        parser.error("informe uma planilha ou --manual ARQUIVO (apenas um dos dois)")
+    if args.streaming and (args.manual or args.por_comunidade or args.processos):
+        parser.error("--streaming só pode ser usado com uma planilha e um único processo")
+    if args.lote and (args.manual or args.streaming or args.por_comunidade):
+        parser.error("--lote não pode ser combinado com --manual, --streaming ou --por-comunidade")
+    if args.por_origem and not args.lote:
+        parser.error("--por-origem só pode ser usado com --lote")
+    if args.normalizar_comunidades and (args.streaming or args.lote):
+        parser.error("--normalizar-comunidades não pode ser usado com --streaming ou --lote")
+    if (args.deduplicar or args.ordenar) and (args.streaming or args.lote):
+        parser.error("--deduplicar e --ordenar não podem ser usados com --streaming ou --lote")
+    if (args.zpl or args.impressora) and (args.lote or args.por_comunidade or args.processos
+                                          or args.formularios):
+        parser.error("--zpl e --impressora não podem ser combinados com --lote, --por-comunidade, "
+                     "--processos ou --formularios")
+    perfil = args.perfil or args.paginas_por_arquivo
+    if perfil and (args.lote or args.por_comunidade or args.processos or args.zpl or args.impressora):
+        parser.error("--perfil e --paginas-por-arquivo não podem ser combinados com --lote, "
+                     "--por-comunidade, --processos, --zpl ou --impressora")
+
+    # Importado aqui para que --help responda sem carregar o núcleo
+    import etiquetas
+
+    if args.metricas is not None:
+        etiquetas.ativar_metricas(args.metricas or None)
+
+    inicio = time.perf_counter()
+    try:
+        if args.lote:
+            resumo = etiquetas.gerar_lote(
+                args.entrada, pasta_saida=args.saida, por_origem=args.por_origem,
+                processos=args.processos, usar_formularios=args.formularios
+            )
+            for item in resumo:
+                aba = f" [{item['aba']}]" if item["aba"] else ""
+                if "erro" in item:
+                    print(f"{item['arquivo']}{aba}: ignorado ({item['erro']})", file=sys.stderr)
+                    continue
+                print(f"{item['arquivo']}{aba}: {item['linhas']} linhas, "
+                      f"{item['paginas']} páginas -> {item['pdf']}")
+            return _concluir(etiquetas, inicio)
+
+        if args.manual:
+            with open(args.manual, encoding="utf-8") as f:
+                capela = "" if args.capela == "VAZIO" else args.capela
+                dados = etiquetas.ler_manual(f.read(), capela)
+        elif args.streaming:
+            dados = etiquetas.ler_excel_streaming(args.entrada)
+        elif args.sem_cache:
+            dados = etiquetas.ler_excel(args.entrada)
+        else:
+            dados = etiquetas.ler_excel_com_cache(args.entrada)
+
+        if args.normalizar_comunidades:
+            dados, relatorio = etiquetas.normalizar_comunidades(dados)
+            for valor, capela in relatorio["corrigidas"].items():
+                print(f"Comunidade '{valor}' -> '{capela}'", file=sys.stderr)
+            for valor, linhas in relatorio["sem_correspondencia"].items():
+                sugestao = relatorio["sugestoes"].get(valor)
+                dica = f"; seria '{sugestao}'?" if sugestao else ""
+                print(f"Comunidade sem capela cadastrada: '{valor}' ({linhas} linhas{dica})",
+                      file=sys.stderr)
+
+        if args.deduplicar or args.ordenar:
+            dados, relatorio = etiquetas.deduplicar_e_ordenar(
+                dados, ordem=args.ordenar, deduplicar=args.deduplicar
+            )
+            if relatorio["removidas"]:
+                print(f"{relatorio['removidas']} linhas com código repetido removidas",
+                      file=sys.stderr)
+            for codigo, nomes in relatorio["conflitos"].items():
+                print(f"Código {codigo} com nomes diferentes: {' / '.join(nomes)}", file=sys.stderr)
+
+        if args.impressora:
+            host, _, porta = args.impressora.partition(":")
+            etiquetas.enviar_zpl(dados, host, int(porta) if porta else etiquetas.PORTA_ZPL)
+            print(f"Enviado para {args.impressora}")
+        elif args.zpl:
+            if args.saida == "-":
+                etiquetas.gerar_zpl(dados, sys.stdout.buffer)
+            else:
+                print(etiquetas.gerar_zpl(dados, args.saida))
+        elif perfil:
+            ajustes = {}
+            if args.paginas_por_arquivo:
+                ajustes["paginas_por_arquivo"] = args.paginas_por_arquivo
+            if args.formularios:
+                ajustes["formularios"] = True
+            relatorio = etiquetas.gerar_pdf_perfil(
+                dados, pdf_path=args.saida, perfil=args.perfil or "padrao", **ajustes
+            )
+            for arquivo in relatorio["arquivos"]:
+                print(arquivo)
+            print(f"Perfil {relatorio['perfil']}: {relatorio['bytes'] / 1024:.0f} KB, "
+                  f"{relatorio['paginas']} páginas em {len(relatorio['arquivos'])} arquivo(s), "
+                  f"{relatorio['segundos']:.2f} s", file=sys.stderr)
+        elif args.por_comunidade:
+            manifesto = etiquetas.gerar_pdf_por_comunidade(
+                dados, args.por_comunidade,
+                processos=args.processos, usar_formularios=args.formularios
+            )
+            for item in manifesto:
+                print(f"{item['arquivo']}: {item['etiquetas']} etiquetas, {item['paginas']} páginas")
+        elif args.processos and args.processos > 1:
+            print(etiquetas.gerar_pdf_paralelo(
+                dados, pdf_path=args.saida,
+                processos=args.processos, usar_formularios=args.formularios
+            ))
+        else:
+            print(etiquetas.gerar_pdf(
+                dados, pdf_path=args.saida, usar_formularios=args.formularios
+            ))
+    except Exception as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+    return _concluir(etiquetas, inicio)
+
+
+def _concluir(etiquetas, inicio):
+    """Tempo total e, com --metricas, o resumo das etapas"""
+    print(f"Concluído em {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
+    if etiquetas.metricas:
+        print(etiquetas.resumo_metricas(etiquetas.metricas), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
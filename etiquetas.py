@@ -0,0 +1,2286 @@
+"""
+Núcleo do gerador de etiquetas Pimaco: leitura das listas (Excel, CSV ou
+entrada manual) e geração do PDF ou de ZPL para impressoras térmicas. Não
+depende do tkinter, para poder ser usado pela linha de comando e em
+servidores sem interface gráfica.
+"""
+import os
+import re
+import csv
+import glob
+import codecs
+import json
+import socket
+import struct
+import hashlib
+import difflib
+import time
+import tempfile
+import unicodedata
+import tracemalloc
+import zlib
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import A4
+
+# =========================
+# LISTA DE CAPELAS
+# =========================
+CAPELAS = [
+    "CAPELA NOSSA SRA. DE FÁTIMA",
+    "CAPELA SAGRADO CORAÇÃO DE JESUS", 
+    "CAPELA SANT'ANNA",
+    "CAPELA SANTA CATARINA",   
+    "CAPELA SÃO JERÔNIMO",
+    "CAPELA SÃO JORGE",
+    "CAPELA SÃO JOSÉ",
+    "CAPELA S. SEBASTIÃO - MEIO DA SERRA",
+    "CAPELA SÃO SEBASTIAO RUA J",   
+    "MATRIZ",
+    "VAZIO"
+]
+
+# =========================
+# CONFIGURAÇÕES PIMACO 3x11
+# =========================
+MM = 2.83465 # Conversão 
+
+ETIQUETA_LARGURA_CM = 6.35
+ETIQUETA_ALTURA_CM = 2.54
+COLUNAS = 3
+LINHAS = 11
+
+MARGEM_ESQ_CM = 0.8
+MARGEM_SUP_CM = 0.9
+ESPACO_H_CM = 0.3
+
+ETIQUETA_LARGURA = ETIQUETA_LARGURA_CM * 10 * MM
+ETIQUETA_ALTURA = ETIQUETA_ALTURA_CM * 10 * MM
+MARGEM_ESQ = MARGEM_ESQ_CM * 10 * MM
+MARGEM_SUP = MARGEM_SUP_CM * 10 * MM
+ESPACO_H = ESPACO_H_CM * 10 * MM
+
+# Variáveis globais para lazy loading
+pandas_loaded = False
+
+class GeracaoCancelada(Exception):
+    """A leitura ou a geração foi interrompida a pedido do usuário"""
+
+    def __init__(self):
+        super().__init__("Geração cancelada.")
+
+# =========================
+# REGISTRO DE ETIQUETA
+# =========================
+# Uma etiqueta como tupla leve: usada pela entrada manual e pelo modo
+# streaming, sem precisar do pandas. O Excel continua gerando DataFrames.
+Etiqueta = namedtuple("Etiqueta", ["nome", "codigo", "comunidade"])
+
+ETIQUETA_VAZIA = Etiqueta("", "", "")
+
+COLUNAS_DATAFRAME = ["NOME", "CÓDIGO DIZIMISTA", "COMUNIDADE"]
+
+def para_dataframe(dados):
+    """Converte uma lista de Etiqueta em DataFrame (DataFrames passam direto)"""
+    if hasattr(dados, "columns"):
+        return dados
+
+    global pandas_loaded
+    if not pandas_loaded:
+        import pandas as pd
+        pandas_loaded = True
+    else:
+        import pandas as pd
+
+    return pd.DataFrame(list(_iterar_registros(dados)), columns=COLUNAS_DATAFRAME)
+
+# =========================
+# MÉTRICAS POR ETAPA
+# =========================
+# Ligadas por ETIQUETAS_METRICAS (1 para o arquivo padrão, ou o caminho do
+# arquivo) ou por ativar_metricas(). Cada etapa vira uma linha JSON.
+ARQUIVO_METRICAS_PADRAO = os.path.join(tempfile.gettempdir(), "gerador_etiquetas_metricas.jsonl")
+
+arquivo_metricas = None
+medir_memoria = True
+metricas = []  # medidas desta sessão, na ordem em que as etapas terminaram
+MAXIMO_METRICAS = 1000  # as mais antigas saem; o arquivo continua com todas
+_etapas_abertas = []
+
+def ativar_metricas(arquivo=None, memoria=True):
+    """
+    Liga a medição das etapas, gravando no arquivo (ou no padrão). Com
+    memoria=False só o tempo é medido: o tracemalloc deixa tudo várias
+    vezes mais lento.
+    """
+    global arquivo_metricas, medir_memoria
+    arquivo_metricas = arquivo or ARQUIVO_METRICAS_PADRAO
+    medir_memoria = memoria
+    os.environ["ETIQUETAS_METRICAS"] = arquivo_metricas  # herdado pelos processos do pool
+
+def limpar_metricas():
+    """Esquece as medidas em memória, no início de cada trabalho de um processo longo"""
+    metricas.clear()
+
+def _metricas_do_ambiente():
+    valor = os.environ.get("ETIQUETAS_METRICAS", "").strip()
+    if valor.lower() in ("", "0", "false", "nao", "não"):
+        return
+    ativar_metricas(None if valor.lower() in ("1", "true", "sim") else valor)
+
+_metricas_do_ambiente()
+
+@contextmanager
+def etapa(nome, **campos):
+    """
+    Mede o bloco como uma etapa: tempo, pico de memória alocada (tracemalloc)
+    e os campos que o chamador preencher no dicionário recebido, como linhas
+    e páginas. Etapas podem ser aninhadas. Com as métricas desligadas, nada
+    é medido.
+    """
+    medida = dict(campos)
+    if arquivo_metricas is None:
+        yield medida
+        return
+
+    iniciou_rastreio = medir_memoria and not tracemalloc.is_tracing()
+    if iniciou_rastreio:
+        tracemalloc.start()
+    atual = pico = 0
+    if medir_memoria:
+        atual, pico = tracemalloc.get_traced_memory()
+        if _etapas_abertas:
+            # reset_peak apaga o pico da etapa de fora: ele é guardado antes
+            pai = _etapas_abertas[-1]
+            pai["pico"] = max(pai["pico"], pico)
+        tracemalloc.reset_peak()
+
+    aberta = {"nome": nome, "pico": atual}
+    _etapas_abertas.append(aberta)
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    except BaseException as e:
+        medida["erro"] = type(e).__name__
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        if medir_memoria:
+            pico = max(aberta["pico"], tracemalloc.get_traced_memory()[1])
+        _etapas_abertas.pop()
+        if _etapas_abertas:
+            _etapas_abertas[-1]["pico"] = max(_etapas_abertas[-1]["pico"], pico)
+        if iniciou_rastreio:
+            tracemalloc.stop()
+
+        registro = {
+            "etapa": nome,
+            "dentro_de": _etapas_abertas[-1]["nome"] if _etapas_abertas else None,
+            "segundos": round(segundos, 4),
+            **medida,
+            "pid": os.getpid(),
+            "horario": datetime.now().isoformat(timespec="seconds")
+        }
+        if medir_memoria:
+            registro["pico_mb"] = round((pico - atual) / (1024 * 1024), 2)
+        metricas.append(registro)
+        if len(metricas) > MAXIMO_METRICAS:
+            del metricas[:len(metricas) - MAXIMO_METRICAS]
+        try:
+            with open(arquivo_metricas, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError:
+            pass  # sem o arquivo, a medida continua em metricas
+
+def resumo_metricas(medidas):
+    """Resumo curto das etapas principais, para a barra de status"""
+    principais = [m for m in medidas if m["dentro_de"] is None]
+    if not principais:
+        return ""
+
+    partes = [f"{m['etapa']} {m['segundos']:.2f} s" for m in principais]
+    if all("pico_mb" in m for m in principais):
+        partes.append(f"pico {max(m['pico_mb'] for m in principais):.1f} MB")
+    linhas = next((m["linhas"] for m in principais if "linhas" in m), None)
+    paginas = next((m["paginas"] for m in principais if "paginas" in m), None)
+    if linhas is not None:
+        partes.append(f"{linhas} linhas")
+    if paginas is not None:
+        partes.append(f"{paginas} páginas")
+    return " · ".join(partes)
+
+# =========================
+# LEITURA DO EXCEL (com lazy loading)
+# =========================
+# Textos que o pandas considera vazios ao ler uma planilha
+VALORES_VAZIOS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null"
+}
+
+LINHAS_BUSCA_CABECALHO = 20
+
+def _texto_celula(valor):
+    """Converte o valor de uma célula em texto, como o pandas faria"""
+    if valor is None:
+        return ""
+    if isinstance(valor, str):
+        return "" if valor in VALORES_VAZIOS else valor
+    if isinstance(valor, float):
+        if valor != valor:
+            return ""
+        if valor.is_integer():
+            return str(int(valor))
+    return str(valor)
+
+def _localizar_colunas(cabecalho):
+    """Retorna os índices das colunas de nome, código e comunidade"""
+    col_nome = col_codigo = col_comunidade = None
+    for i, c in enumerate(cabecalho):
+        c = str(c).strip().upper()
+        if "NOME" in c:
+            col_nome = i
+        if "CÓDIGO" in c:
+            col_codigo = i
+        if "COMUNIDADE" in c or "CAPELA" in c:
+            col_comunidade = i
+
+    if None in (col_nome, col_codigo, col_comunidade):
+        raise Exception("Colunas obrigatórias não encontradas.")
+
+    return col_nome, col_codigo, col_comunidade
+
+def _ler_excel_pandas(caminho, aba=None):
+    """Leitura em duas passadas com o pandas (usada para arquivos .xls)"""
+    global pandas_loaded
+    if not pandas_loaded:
+        import pandas as pd
+        pandas_loaded = True
+    else:
+        import pandas as pd
+    
+    aba = 0 if aba is None else aba
+    with etapa("leitura_bruta") as medida:
+        df_bruto = pd.read_excel(caminho, sheet_name=aba, header=None)
+        medida["linhas"] = len(df_bruto)
+
+    with etapa("cabecalho"):
+        linha_cabecalho = None
+        for i in range(min(20, len(df_bruto))):  # Limita a busca
+            linha = [str(cel).upper() for cel in df_bruto.iloc[i].tolist()]
+            if any("NOME" in cel for cel in linha):
+                linha_cabecalho = i
+                break
+
+    if linha_cabecalho is None:
+        raise Exception("Cabeçalho com 'NOME' não encontrado.")
+
+    with etapa("leitura") as medida:
+        df = pd.read_excel(caminho, sheet_name=aba, header=linha_cabecalho)
+        medida["linhas"] = len(df)
+    df.columns = [str(c).strip().upper() for c in df.columns]
+
+    col_nome = col_codigo = col_comunidade = None
+    for c in df.columns:
+        if "NOME" in c:
+            col_nome = c
+        if "CÓDIGO" in c:
+            col_codigo = c
+        if "COMUNIDADE" in c or "CAPELA" in c:
+            col_comunidade = c
+
+    if not all([col_nome, col_codigo, col_comunidade]):
+        raise Exception("Colunas obrigatórias não encontradas.")
+
+    with etapa("normalizacao"):
+        df[col_nome] = df[col_nome].fillna("").astype(str).str.upper()
+        df[col_codigo] = (
+            df[col_codigo]
+            .fillna("")
+            .astype(str)
+            .str.replace(r"\.0$", "", regex=True)
+        )
+        df[col_comunidade] = df[col_comunidade].fillna("").astype(str).str.upper()
+
+    return df[[col_nome, col_codigo, col_comunidade]].rename(columns={
+        col_nome: "NOME",
+        col_codigo: "CÓDIGO DIZIMISTA",
+        col_comunidade: "COMUNIDADE"
+    })
+
+def _localizar_cabecalho(linhas):
+    """Avança nas linhas até o cabeçalho e retorna os índices das colunas"""
+    for i, linha in enumerate(linhas):
+        if i >= LINHAS_BUSCA_CABECALHO:
+            break
+        if any("NOME" in str(cel).upper() for cel in linha if cel is not None):
+            return _localizar_colunas(
+                "" if cel is None else cel for cel in linha
+            )
+
+    raise Exception("Cabeçalho com 'NOME' não encontrado.")
+
+def _abrir_planilha(caminho, aba=None):
+    """Abre a aba (a primeira, por padrão) em modo somente leitura e localiza o cabeçalho"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = wb.worksheets[0] if aba is None else wb[aba]
+        linhas = planilha.iter_rows(values_only=True)
+        return wb, linhas, _localizar_cabecalho(linhas)
+    except Exception:
+        wb.close()
+        raise
+
+# Extensões lidas como texto delimitado, e os delimitadores aceitos
+EXTENSOES_TEXTO = (".csv", ".tsv", ".txt")
+DELIMITADORES_CSV = ";,\t|"
+TAMANHO_AMOSTRA_CSV = 64 * 1024
+
+def _detectar_codificacao(amostra):
+    """UTF-8 (com ou sem BOM) quando a amostra é válida; senão Windows-1252/Latin-1"""
+    if amostra.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: um caractere cortado no fim da amostra não é erro
+        codecs.getincrementaldecoder("utf-8")().decode(amostra, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        amostra.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+def _detectar_delimitador(texto, extensao):
+    """Descobre o delimitador pela amostra; na dúvida, o mais frequente"""
+    if extensao == ".tsv":
+        return "\t"
+    try:
+        return csv.Sniffer().sniff(texto, delimiters=DELIMITADORES_CSV).delimiter
+    except csv.Error:
+        return max(DELIMITADORES_CSV, key=texto.count)
+
+def _abrir_csv(caminho):
+    """Abre o CSV/TSV detectando codificação e delimitador e localiza o cabeçalho"""
+    with open(caminho, "rb") as f:
+        amostra = f.read(TAMANHO_AMOSTRA_CSV)
+    codificacao = _detectar_codificacao(amostra)
+    delimitador = _detectar_delimitador(
+        amostra.decode(codificacao, errors="ignore"),
+        os.path.splitext(caminho)[1].lower()
+    )
+
+    arquivo = open(caminho, newline="", encoding=codificacao, errors="replace")
+    try:
+        # Linhas em branco são puladas, como no read_csv do pandas
+        linhas = (linha for linha in csv.reader(arquivo, delimiter=delimitador) if linha)
+        return arquivo, linhas, _localizar_cabecalho(linhas)
+    except Exception:
+        arquivo.close()
+        raise
+
+def _abrir_arquivo(caminho, aba=None):
+    """Abre planilha .xlsx ou arquivo CSV/TSV conforme a extensão"""
+    if os.path.splitext(caminho)[1].lower() in EXTENSOES_TEXTO:
+        return _abrir_csv(caminho)
+    return _abrir_planilha(caminho, aba)
+
+def _linhas_planilha(arquivo, linhas, colunas):
+    """Gera (nome, código, comunidade) de cada linha, já normalizados"""
+    col_nome, col_codigo, col_comunidade = colunas
+    largura = max(colunas) + 1
+    vazias_pendentes = 0  # linhas vazias no fim da planilha são descartadas
+
+    try:
+        for linha in linhas:
+            if all(cel is None or cel == "" for cel in linha):
+                vazias_pendentes += 1
+                continue
+
+            for _ in range(vazias_pendentes):
+                yield ("", "", "")
+            vazias_pendentes = 0
+
+            if len(linha) < largura:
+                linha = tuple(linha) + (None,) * (largura - len(linha))
+
+            yield (
+                _texto_celula(linha[col_nome]).upper(),
+                re.sub(r"\.0$", "", _texto_celula(linha[col_codigo])),
+                _texto_celula(linha[col_comunidade]).upper()
+            )
+    finally:
+        arquivo.close()
+
+# A cada quantas linhas lidas o callback de progresso é chamado
+INTERVALO_PROGRESSO_LEITURA = 1000
+
+def ler_excel(caminho, progresso=None, cancelar=None, aba=None):
+    """
+    Lê a planilha (ou um CSV/TSV) em uma única passada, mantendo só as
+    três colunas usadas. progresso(linhas) é chamado periodicamente; se cancelar (um
+    threading.Event) for acionado, a leitura para com GeracaoCancelada.
+    aba escolhe a aba pelo nome; sem ela, é lida a primeira.
+    """
+    with etapa("ler_excel", arquivo=os.path.basename(caminho)) as medida:
+        dados = _ler_excel(caminho, progresso, cancelar, aba)
+        medida["linhas"] = len(dados)
+    return dados
+
+def _ler_excel(caminho, progresso, cancelar, aba):
+    if os.path.splitext(caminho)[1].lower() == ".xls":
+        return _ler_excel_pandas(caminho, aba)
+
+    global pandas_loaded
+    if not pandas_loaded:
+        import pandas as pd
+        pandas_loaded = True
+    else:
+        import pandas as pd
+
+    with etapa("cabecalho"):
+        aberto = _abrir_arquivo(caminho, aba)
+
+    nomes, codigos, comunidades = [], [], []
+    with etapa("linhas") as medida:
+        for linha, (nome, codigo, comunidade) in enumerate(_linhas_planilha(*aberto), start=1):
+            nomes.append(nome)
+            codigos.append(codigo)
+            comunidades.append(comunidade)
+
+            if linha % INTERVALO_PROGRESSO_LEITURA == 0:
+                if cancelar is not None and cancelar.is_set():
+                    raise GeracaoCancelada()
+                if progresso:
+                    progresso(linha)
+        medida["linhas"] = len(nomes)
+
+    with etapa("dataframe"):
+        return pd.DataFrame({
+            "NOME": nomes,
+            "CÓDIGO DIZIMISTA": codigos,
+            "COMUNIDADE": comunidades
+        })
+
+def ler_excel_streaming(caminho):
+    """
+    Lê a planilha (ou CSV/TSV) como um gerador de Etiqueta, sem montar um
+    DataFrame. O cabeçalho é validado aqui; as linhas só são lidas conforme o consumo.
+    """
+    if os.path.splitext(caminho)[1].lower() == ".xls":
+        linhas = _iterar_registros(_ler_excel_pandas(caminho))
+    else:
+        linhas = _linhas_planilha(*_abrir_arquivo(caminho))
+
+    return (Etiqueta._make(linha) for linha in linhas)
+
+def ler_csv_streaming(caminho):
+    """
+    Lê um CSV/TSV como gerador de Etiqueta. Codificação (UTF-8 ou Latin-1)
+    e delimitador são detectados por uma amostra do início do arquivo.
+    """
+    return (Etiqueta._make(linha) for linha in _linhas_planilha(*_abrir_csv(caminho)))
+
+# =========================
+# CACHE DE PLANILHAS LIDAS
+# =========================
+PASTA_CACHE = os.environ.get("ETIQUETAS_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "gerador_etiquetas"
+)
+TAMANHO_MAXIMO_CACHE = 256 * 1024 * 1024  # bytes; as entradas menos usadas saem primeiro
+
+# Formato: MAGICA, sha256 do conteúdo, número de linhas, tamanho de cada
+# coluna e as três colunas em UTF-8 com os valores separados por \x00
+# (caractere que não existe em planilhas).
+MAGICA_CACHE = b"ETQCACH1"
+_CABECALHO_CACHE = struct.Struct("<8s32sQQQQ")
+
+def _impressao_digital(caminho):
+    """Chave do arquivo: caminho, tamanho, data de modificação e hash do conteúdo"""
+    caminho = os.path.abspath(caminho)
+    info = os.stat(caminho)
+
+    conteudo = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            conteudo.update(bloco)
+
+    prefixo = hashlib.sha256(caminho.encode("utf-8")).hexdigest()[:16]
+    chave = hashlib.sha256(
+        f"{caminho}|{info.st_size}|{info.st_mtime_ns}|{conteudo.hexdigest()}".encode("utf-8")
+    ).hexdigest()
+    return prefixo, chave
+
+def _gravar_cache(arquivo, colunas):
+    blocos = [b"\x00".join(v.encode("utf-8") for v in coluna) for coluna in colunas]
+    corpo = b"".join(blocos)
+    cabecalho = _CABECALHO_CACHE.pack(
+        MAGICA_CACHE, hashlib.sha256(corpo).digest(),
+        len(colunas[0]), *(len(b) for b in blocos)
+    )
+
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(cabecalho)
+        f.write(corpo)
+    os.replace(temporario, arquivo)
+
+def _carregar_cache(arquivo):
+    """Retorna as três colunas da entrada ou None se ela não existir ou estiver corrompida"""
+    try:
+        with open(arquivo, "rb") as f:
+            conteudo = f.read()
+    except OSError:
+        return None
+
+    try:
+        magica, hash_corpo, linhas, *tamanhos = _CABECALHO_CACHE.unpack_from(conteudo)
+        corpo = memoryview(conteudo)[_CABECALHO_CACHE.size:]
+        if magica != MAGICA_CACHE or len(corpo) != sum(tamanhos) \
+                or hashlib.sha256(corpo).digest() != hash_corpo:
+            raise ValueError("entrada de cache inválida")
+
+        colunas, inicio = [], 0
+        for tamanho in tamanhos:
+            bloco = bytes(corpo[inicio:inicio + tamanho])
+            inicio += tamanho
+            coluna = bloco.decode("utf-8").split("\x00") if linhas else []
+            if len(coluna) != linhas:
+                raise ValueError("entrada de cache inválida")
+            colunas.append(coluna)
+        return colunas
+    except (ValueError, struct.error, UnicodeDecodeError):
+        # Corrompida: apaga para ser refeita a partir da planilha
+        try:
+            os.remove(arquivo)
+        except OSError:
+            pass
+        return None
+
+def _limitar_cache(pasta, tamanho_maximo):
+    """Remove as entradas usadas há mais tempo até caber no tamanho máximo"""
+    entradas = []
+    for nome in os.listdir(pasta):
+        if nome.endswith(".etq"):
+            caminho = os.path.join(pasta, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= tamanho_maximo:
+            break
+        try:
+            os.remove(caminho)
+            total -= tamanho
+        except OSError:
+            pass
+
+def ler_excel_com_cache(caminho, pasta_cache=None, tamanho_maximo=TAMANHO_MAXIMO_CACHE,
+                        progresso=None, cancelar=None):
+    """
+    Como ler_excel, mas guarda o resultado normalizado em disco. Se a mesma
+    planilha (mesmo caminho, tamanho, data e conteúdo) for lida de novo, o
+    Excel não é reprocessado. Entradas corrompidas são refeitas e versões
+    antigas do mesmo arquivo são descartadas.
+    """
+    pasta = pasta_cache or PASTA_CACHE
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        prefixo, chave = _impressao_digital(caminho)
+    except OSError:
+        return ler_excel(caminho, progresso=progresso, cancelar=cancelar)
+
+    arquivo = os.path.join(pasta, f"{prefixo}_{chave}.etq")
+    with etapa("ler_cache") as medida:
+        colunas = _carregar_cache(arquivo)
+        medida["acerto"] = colunas is not None
+        if colunas is not None:
+            medida["linhas"] = len(colunas[0])
+    if colunas is not None:
+        os.utime(arquivo)  # marca como usada recentemente
+        global pandas_loaded
+        if not pandas_loaded:
+            import pandas as pd
+            pandas_loaded = True
+        else:
+            import pandas as pd
+        return pd.DataFrame(dict(zip(COLUNAS_DATAFRAME, colunas)))
+
+    dados = ler_excel(caminho, progresso=progresso, cancelar=cancelar)
+
+    try:
+        for nome in os.listdir(pasta):
+            if nome.startswith(prefixo + "_") and nome.endswith(".etq"):
+                os.remove(os.path.join(pasta, nome))
+        _gravar_cache(arquivo, [dados[c].tolist() for c in COLUNAS_DATAFRAME])
+        _limitar_cache(pasta, tamanho_maximo)
+    except OSError:
+        pass  # sem cache, a leitura continua valendo
+
+    return dados
+
+# =========================
+# ENTRADA MANUAL
+# =========================
+# Linhas já analisadas, memorizadas para a validação enquanto se digita
+TAMANHO_CACHE_LINHAS_MANUAIS = 4096
+
+@lru_cache(maxsize=TAMANHO_CACHE_LINHAS_MANUAIS)
+def analisar_linha_manual(linha):
+    """
+    Interpreta uma linha no formato Posição;NOME;Código. Retorna
+    (posição, nome, código), None para linhas ignoradas (sem ';') ou o
+    texto do erro, sem o número da linha.
+    """
+    partes = [p.strip() for p in linha.split(";")]
+    if len(partes) < 2:
+        return None
+
+    try:
+        posicao = int(partes[0])
+    except ValueError:
+        return "Posicao deve ser um numero"
+
+    if not (1 <= posicao <= 33):
+        return "Posicao deve ser entre 1 e 33"
+
+    codigo = partes[2] if len(partes) >= 3 else ""
+    return posicao, partes[1].upper(), codigo
+
+def ler_manual(texto, capela):
+    with etapa("ler_manual") as medida:
+        dados = _ler_manual(texto, capela)
+        medida["linhas"] = len(dados)
+    return dados
+
+def _ler_manual(texto, capela):
+    # Numeradas como no editor da interface (validar_entrada_manual): sem
+    # strip, que mudaria o número de todas as linhas depois das em branco
+    linhas = texto.split("\n")
+    registros = []
+
+    for numero_linha, linha in enumerate(linhas, start=1):
+        resultado = analisar_linha_manual(linha)
+        if resultado is None:
+            continue
+        if isinstance(resultado, str):
+            raise Exception(f"Linha {numero_linha}: {resultado}")
+
+        posicao, nome, codigo = resultado
+        registros.append({
+            "POSICAO": posicao,
+            "NOME": nome,
+            "CÓDIGO DIZIMISTA": codigo,
+            "COMUNIDADE": capela
+        })
+
+    if not registros:
+        raise Exception("Nenhuma linha válida encontrada.")
+
+    registros.sort(key=lambda x: x["POSICAO"])
+    posicao_inicial = registros[0]["POSICAO"]
+
+    # Lista de Etiqueta: a entrada manual não precisa do pandas
+    dados = [ETIQUETA_VAZIA] * (posicao_inicial - 1)
+
+    for r in registros:
+        dados.append(Etiqueta(r["NOME"], r["CÓDIGO DIZIMISTA"], r["COMUNIDADE"]))
+
+    return dados
+
+# =========================
+# LAYOUT DA FOLHA
+# =========================
+ETIQUETAS_POR_PAGINA = COLUNAS * LINHAS
+
+def calcular_slots():
+    """
+    Calcula uma vez as posições das etiquetas da folha, na ordem de
+    preenchimento (esquerda para a direita, de cima para baixo).
+    Cada slot é (x, y, x_centro, linha_base).
+    """
+    largura_pagina, altura_pagina = A4
+    slots = []
+
+    y = altura_pagina - MARGEM_SUP - ETIQUETA_ALTURA
+    for _ in range(LINHAS):
+        x = MARGEM_ESQ
+        for _ in range(COLUNAS):
+            slots.append((x, y, x + ETIQUETA_LARGURA / 2, y + ETIQUETA_ALTURA - (6 * MM)))
+            x += ETIQUETA_LARGURA + ESPACO_H
+        y -= ETIQUETA_ALTURA
+
+    return tuple(slots)
+
+SLOTS = calcular_slots()
+
+def _paginas_dataframe(dados):
+    """
+    Distribui as linhas do DataFrame em (página, slot) de uma vez com NumPy.
+    Gera (página_completa, [(slot, nome, código, comunidade), ...]) por página,
+    só com as etiquetas preenchidas; as vazias apenas ocupam o slot.
+    """
+    import numpy as np
+
+    nomes = dados["NOME"].to_numpy(dtype=object)
+    codigos = dados["CÓDIGO DIZIMISTA"].to_numpy(dtype=object)
+    comunidades = dados["COMUNIDADE"].to_numpy(dtype=object)
+
+    total = len(nomes)
+    preenchidas = np.flatnonzero((nomes != "") | (codigos != "") | (comunidades != ""))
+    paginas = preenchidas // ETIQUETAS_POR_PAGINA
+    slots = preenchidas % ETIQUETAS_POR_PAGINA
+
+    total_paginas = -(-total // ETIQUETAS_POR_PAGINA)
+    limites = np.searchsorted(paginas, np.arange(total_paginas + 1))
+
+    for pagina in range(total_paginas):
+        inicio, fim = limites[pagina], limites[pagina + 1]
+        indices = preenchidas[inicio:fim].tolist()
+        completa = (pagina + 1) * ETIQUETAS_POR_PAGINA <= total
+        yield completa, list(zip(
+            slots[inicio:fim].tolist(),
+            nomes[indices],
+            codigos[indices],
+            comunidades[indices]
+        ))
+
+def _paginas_registros(registros):
+    """Agrupa um iterável de registros em páginas, guardando no máximo uma folha"""
+    pagina = []
+    slot = 0
+
+    for nome, codigo, comunidade in registros:
+        if nome or codigo or comunidade:
+            pagina.append((slot, nome, codigo, comunidade))
+        slot += 1
+
+        if slot == ETIQUETAS_POR_PAGINA:
+            yield True, pagina
+            pagina = []
+            slot = 0
+
+    if slot:
+        yield False, pagina
+
+def paginar(dados):
+    """Gera as páginas de etiquetas de um DataFrame ou iterável de registros"""
+    if hasattr(dados, "columns"):
+        return _paginas_dataframe(dados)
+    return _paginas_registros(_iterar_registros(dados))
+
+# =========================
+# GERAÇÃO DO PDF
+# =========================
+def _iterar_registros(dados):
+    """
+    Gera (nome, código, comunidade) a partir de um DataFrame ou de qualquer
+    iterável de Etiqueta (ou dicts com as colunas do DataFrame), sem criar
+    uma Series por linha.
+    """
+    if hasattr(dados, "columns"):
+        return zip(dados["NOME"], dados["CÓDIGO DIZIMISTA"], dados["COMUNIDADE"])
+
+    return (
+        (r["NOME"], r["CÓDIGO DIZIMISTA"], r["COMUNIDADE"]) if isinstance(r, dict) else r
+        for r in dados
+    )
+
+FONTE_CODIGO = ("Helvetica-Bold", 14)
+FONTE_COMUNIDADE = ("Helvetica", 7.5)
+FONTE_NOME = ("Helvetica-Bold", 10.5)
+
+# Distância (pt) de cada linha abaixo da linha de base do código
+DESLOCAMENTO_COMUNIDADE = 10
+DESLOCAMENTO_NOME = 23
+ENTRELINHA_NOME = 11
+LARGURA_NOME = ETIQUETA_LARGURA - 15
+
+# Tamanho máximo dos caches de quebra de linha e largura de texto
+TAMANHO_CACHE_TEXTO = 8192
+
+# Contadores de trocas de fonte feitas e evitadas pelo CanvasEtiquetas
+trocas_fonte = {"feitas": 0, "evitadas": 0}
+
+# Conteúdo já desenhado de cada página, pela chave de _chave_pagina; as
+# menos usadas saem primeiro quando o total passa do limite em bytes.
+# Só é usado quando pedido (usar_cache_paginas), como na interface, que
+# gera o mesmo PDF várias vezes com poucas mudanças.
+TAMANHO_MAXIMO_CACHE_PAGINAS = 16 * 1024 * 1024  # bytes
+cache_paginas = OrderedDict()
+uso_cache_paginas = {"acertos": 0, "falhas": 0, "bytes": 0}
+
+@lru_cache(maxsize=TAMANHO_CACHE_TEXTO)
+def quebrar_texto(texto, fonte, tamanho, largura):
+    """Quebra o texto em linhas que cabem na largura (resultado memorizado)"""
+    from reportlab.lib.utils import simpleSplit
+    return tuple(simpleSplit(texto, fonte, tamanho, largura))
+
+@lru_cache(maxsize=TAMANHO_CACHE_TEXTO)
+def largura_texto(texto, fonte, tamanho):
+    """Largura do texto na fonte e tamanho dados (resultado memorizado)"""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    return stringWidth(texto, fonte, tamanho)
+
+def estatisticas_cache():
+    """Acertos e falhas dos caches de texto e trocas de fonte evitadas"""
+    quebra = quebrar_texto.cache_info()
+    largura = largura_texto.cache_info()
+    return {
+        "quebra": {"acertos": quebra.hits, "falhas": quebra.misses, "itens": quebra.currsize},
+        "largura": {"acertos": largura.hits, "falhas": largura.misses, "itens": largura.currsize},
+        "fontes": dict(trocas_fonte),
+        "paginas": {**uso_cache_paginas, "itens": len(cache_paginas)}
+    }
+
+def limpar_cache_paginas():
+    """Esvazia o cache de páginas (os contadores de acertos e falhas continuam)"""
+    cache_paginas.clear()
+    uso_cache_paginas["bytes"] = 0
+
+def _chave_pagina(tela, etiquetas, layout):
+    """
+    Chave do cache de páginas: os registros da página, o layout e os nomes
+    internos das fontes no documento (/F1, /F2...), que aparecem no conteúdo.
+    """
+    return (
+        tuple(etiquetas),
+        layout,
+        tuple(tela.c._doc.getInternalFontName(fonte) for fonte, _ in
+              (FONTE_CODIGO, FONTE_COMUNIDADE, FONTE_NOME))
+    )
+
+class CanvasEtiquetas:
+    """
+    Envolve o canvas do ReportLab guardando a fonte ativa, para não repetir
+    setFont, e escrevendo os textos de uma mesma fonte em um único objeto
+    de texto, centralizados pela largura memorizada.
+    """
+
+    def __init__(self, c):
+        self.c = c
+        self.fonte = None
+        self.texto = None
+        self.formularios = {}
+        self.origem = None
+
+    def usar_fonte(self, fonte):
+        if fonte == self.fonte:
+            trocas_fonte["evitadas"] += 1
+            return
+        self._fechar_texto()
+        self._fechar_formularios()
+        self.c.setFont(*fonte)
+        self.fonte = fonte
+        trocas_fonte["feitas"] += 1
+
+    def texto_centralizado(self, x, y, texto):
+        self._fechar_formularios()
+        if self.texto is None:
+            self.texto = self.c.beginText()
+        largura = largura_texto(texto, *self.fonte)
+        self.texto.setTextOrigin(x - 0.5 * largura, y)
+        self.texto.textOut(texto)
+
+    def formulario(self, texto, fonte):
+        """
+        Registra o texto centralizado na origem como um Form XObject (uma vez
+        por documento) e retorna o nome do formulário.
+        """
+        chave = (texto, fonte)
+        nome = self.formularios.get(chave)
+        if nome is None:
+            nome = f"t{len(self.formularios)}"
+            largura_pagina, altura_pagina = A4
+            self._fechar_texto()
+            self._fechar_formularios()
+            self.c.beginForm(
+                nome,
+                lowerx=-largura_pagina, lowery=-ETIQUETA_ALTURA,
+                upperx=largura_pagina, uppery=ETIQUETA_ALTURA
+            )
+            self.c.setFont(*fonte)
+            self.c.drawCentredString(0, 0, texto)
+            self.c.endForm()
+            self.formularios[chave] = nome
+            self.fonte = None
+        return nome
+
+    def usar_formulario(self, nome, x, y):
+        """Posiciona o formulário em (x, y) deslocando a origem desde o último uso"""
+        self._fechar_texto()
+        if self.origem is None:
+            self.c.saveState()
+            self.origem = (0, 0)
+        self.c.translate(x - self.origem[0], y - self.origem[1])
+        self.origem = (x, y)
+        self.c.doForm(nome)
+
+    def _fechar_formularios(self):
+        if self.origem is not None:
+            self.c.restoreState()
+            self.origem = None
+
+    def _fechar_texto(self):
+        if self.texto is not None:
+            self.c.drawText(self.texto)
+            self.texto = None
+
+    def conteudo_pagina(self):
+        """Operadores PDF da página atual, para o cache de páginas"""
+        self._fechar_texto()
+        self._fechar_formularios()
+        return tuple(self.c._code)
+
+    def repetir_pagina(self, conteudo):
+        """Escreve na página atual o conteúdo guardado de outra idêntica"""
+        self._fechar_texto()
+        self._fechar_formularios()
+        self.c._code.extend(conteudo)
+        self.fonte = None
+
+    def nova_pagina(self):
+        # O ReportLab volta à fonte padrão a cada página
+        self._fechar_texto()
+        self._fechar_formularios()
+        self.c.showPage()
+        self.fonte = None
+
+    def salvar(self):
+        self._fechar_texto()
+        self._fechar_formularios()
+        self.c.save()
+
+def _desenhar_pagina(tela, etiquetas, usar_formularios=False):
+    """
+    Desenha as etiquetas de uma página agrupando o texto por fonte:
+    três trocas de fonte por página em vez de três por etiqueta.
+    Com usar_formularios, a linha da comunidade é desenhada uma única vez
+    por documento e cada etiqueta só referencia o formulário.
+    """
+    if not etiquetas:
+        return
+
+    if usar_formularios:
+        formularios = {
+            comunidade: tela.formulario(comunidade, FONTE_COMUNIDADE)
+            for comunidade in dict.fromkeys(e[3] for e in etiquetas)
+        }
+
+    tela.usar_fonte(FONTE_CODIGO)
+    for slot, nome, codigo, comunidade in etiquetas:
+        _, _, x_centro, linha_base = SLOTS[slot]
+        tela.texto_centralizado(x_centro, linha_base, f"Nº {codigo}")
+
+    if usar_formularios:
+        for slot, nome, codigo, comunidade in etiquetas:
+            _, _, x_centro, linha_base = SLOTS[slot]
+            tela.usar_formulario(formularios[comunidade], x_centro, linha_base - DESLOCAMENTO_COMUNIDADE)
+    else:
+        tela.usar_fonte(FONTE_COMUNIDADE)
+        for slot, nome, codigo, comunidade in etiquetas:
+            _, _, x_centro, linha_base = SLOTS[slot]
+            tela.texto_centralizado(x_centro, linha_base - DESLOCAMENTO_COMUNIDADE, comunidade)
+
+    tela.usar_fonte(FONTE_NOME)
+    for slot, nome, codigo, comunidade in etiquetas:
+        _, _, x_centro, linha_base = SLOTS[slot]
+        linhas = quebrar_texto(nome, *FONTE_NOME, LARGURA_NOME)
+        for i, linha in enumerate(linhas[:2]):
+            tela.texto_centralizado(
+                x_centro, linha_base - DESLOCAMENTO_NOME - (i * ENTRELINHA_NOME), linha
+            )
+
+def pasta_saida_padrao():
+    """Área de Trabalho, Documentos ou pasta temporária, a primeira gravável"""
+    desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+    documents_path = os.path.join(os.path.expanduser("~"), "Documents")
+
+    # Verificar qual pasta está acessível
+    if os.access(desktop_path, os.W_OK):
+        return desktop_path
+    elif os.access(documents_path, os.W_OK):
+        return documents_path
+    # Usar pasta temporária como último recurso
+    return tempfile.gettempdir()
+
+def _caminho_com_data(extensao, pasta=None, prefixo="etiquetas"):
+    """Nome com data e hora (na pasta padrão, sem pasta), para não sobrescrever saídas anteriores"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(pasta or pasta_saida_padrao(), f"{prefixo}_{timestamp}{extensao}")
+
+@contextmanager
+def _gravando_saida(tipo, arquivos):
+    """
+    Em qualquer falha, inclusive cancelamento, remove os arquivos que esta
+    geração escreveu (arquivos() os lista) e traduz o erro para a mensagem
+    mostrada ao usuário. Quem escreve grava em _nome_temporario e só troca
+    o destino no fim, então um arquivo anterior no destino nunca é listado.
+    """
+    try:
+        yield
+    except BaseException as erro:
+        for arquivo in arquivos():
+            try:
+                os.remove(arquivo)
+            except OSError:
+                pass
+        if isinstance(erro, GeracaoCancelada) or not isinstance(erro, Exception):
+            raise
+        if isinstance(erro, PermissionError):
+            raise Exception(f"Permissão negada para salvar o arquivo.\nTente fechar o arquivo {tipo} anterior ou escolher outra pasta.")
+        raise Exception(f"Erro ao gerar {tipo}: {str(erro)}")
+
+def _desenhar_pagina_com_cache(tela, etiquetas, layout):
+    """Reaproveita o conteúdo de uma página já desenhada com os mesmos registros"""
+    chave = _chave_pagina(tela, etiquetas, layout)
+    guardado = cache_paginas.get(chave)
+    if guardado is not None:
+        cache_paginas.move_to_end(chave)
+        tela.repetir_pagina(guardado[0])
+        uso_cache_paginas["acertos"] += 1
+        return True
+
+    _desenhar_pagina(tela, etiquetas)
+    conteudo = tela.conteudo_pagina()
+    # Operadores e textos dos registros; é a parte que cresce com a página
+    tamanho = sum(map(len, conteudo)) + sum(len(str(e[1])) + len(str(e[2])) + len(str(e[3]))
+                                            for e in etiquetas)
+    cache_paginas[chave] = (conteudo, tamanho)
+    uso_cache_paginas["bytes"] += tamanho
+    while uso_cache_paginas["bytes"] > TAMANHO_MAXIMO_CACHE_PAGINAS and cache_paginas:
+        _, (_, removido) = cache_paginas.popitem(last=False)
+        uso_cache_paginas["bytes"] -= removido
+    uso_cache_paginas["falhas"] += 1
+    return False
+
+class _CompressaoFlate:
+    """
+    Filtro de stream no formato do ReportLab (pdfname + encode) com nível de
+    compressão escolhido. O padrão do ReportLab só liga ou desliga e ainda
+    codifica em ASCII85, o que aumenta o arquivo em um quarto.
+    """
+    pdfname = "FlateDecode"
+
+    def __init__(self, nivel):
+        self.nivel = nivel
+
+    def encode(self, texto):
+        if isinstance(texto, str):
+            texto = texto.encode("utf8")
+        return zlib.compress(texto, self.nivel)
+
+def _nome_temporario(destino):
+    """Onde a saída é escrita até ficar completa; os.replace a põe no destino"""
+    return f"{destino}.parcial"
+
+def _nome_parte(destino, indice):
+    base, extensao = os.path.splitext(destino)
+    return f"{base}_parte{indice:03d}{extensao}"
+
+class RenderizadorPDF:
+    """
+    Saída padrão: folhas A4 desenhadas pelo ReportLab. destino é um caminho
+    ou um arquivo binário aberto.
+    compressao: None mantém o padrão do ReportLab; 0 grava sem compressão;
+    1 a 9 usa zlib nesse nível, sem ASCII85.
+    paginas_por_arquivo: fecha o arquivo a cada N páginas e continua em
+    destino_parte002.pdf, destino_parte003.pdf... (só com caminho).
+    Com caminho, cada arquivo é salvo com outro nome e só então trocado
+    pelo destino: um PDF que já exista ali continua intacto se a geração
+    falhar. gravados lista os arquivos que esta geração já salvou.
+    """
+    def __init__(self, destino, usar_formularios=False, usar_cache_paginas=False,
+                 compressao=None, paginas_por_arquivo=None):
+        self.destino = destino
+        self.usar_formularios = usar_formularios
+        self.usar_cache_paginas = usar_cache_paginas and not usar_formularios
+        self.layout = hash((SLOTS, FONTE_CODIGO, FONTE_COMUNIDADE, FONTE_NOME, LARGURA_NOME))
+        self.compressao = compressao
+        self.paginas_por_arquivo = paginas_por_arquivo
+        self.reaproveitadas = 0
+        self.arquivos = []
+        self.gravados = []
+        self.temporario = None
+        self.paginas_no_arquivo = 0
+        self.tela = self._abrir()
+
+    def _abrir(self):
+        from reportlab.pdfgen import canvas
+
+        destino = self.destino
+        if self.paginas_por_arquivo:
+            destino = _nome_parte(destino, len(self.arquivos) + 1)
+        self.arquivos.append(destino)
+        if isinstance(destino, (str, os.PathLike)):
+            destino = self.temporario = _nome_temporario(destino)
+
+        if self.compressao is None:
+            c = canvas.Canvas(destino, pagesize=A4)
+        else:
+            c = canvas.Canvas(destino, pagesize=A4, pageCompression=0)
+            if self.compressao:
+                c._doc.defaultStreamFilters = [_CompressaoFlate(self.compressao)]
+        self.paginas_no_arquivo = 0
+        return CanvasEtiquetas(c)
+
+    def pagina(self, etiquetas, completa):
+        if self.tela is None:
+            self.tela = self._abrir()
+
+        if self.usar_cache_paginas:
+            self.reaproveitadas += _desenhar_pagina_com_cache(self.tela, etiquetas, self.layout)
+        else:
+            _desenhar_pagina(self.tela, etiquetas, self.usar_formularios)
+        self.paginas_no_arquivo += 1
+
+        if not completa:
+            return
+        if self.paginas_por_arquivo and self.paginas_no_arquivo >= self.paginas_por_arquivo:
+            # O próximo arquivo só é criado se houver mais páginas
+            self._salvar()
+        else:
+            self.tela.nova_pagina()
+
+    def estatisticas(self):
+        return {"paginas_em_cache": self.reaproveitadas, "arquivos": len(self.arquivos)}
+
+    def _salvar(self):
+        self.tela.salvar()
+        self.tela = None
+        if self.temporario is not None:
+            os.replace(self.temporario, self.arquivos[-1])
+            self.temporario = None
+            self.gravados.append(self.arquivos[-1])
+
+    def parciais(self):
+        """Arquivos a remover se a geração falhar: só os que ela mesma escreveu"""
+        return self.gravados + ([self.temporario] if self.temporario is not None else [])
+
+    def fechar(self):
+        if self.tela is not None:
+            self._salvar()
+
+def _renderizar(dados, renderizador, progresso=None, cancelar=None):
+    """
+    Percorre as páginas dos dados entregando cada uma ao renderizador, que
+    precisa de pagina(etiquetas, completa), estatisticas() e fechar().
+    Retorna o número de páginas.
+    """
+    total = -(-len(dados) // ETIQUETAS_POR_PAGINA) if hasattr(dados, "__len__") else None
+
+    pagina = 0
+    with etapa("desenho") as desenho:
+        for pagina, (completa, etiquetas) in enumerate(paginar(dados), start=1):
+            if cancelar is not None and cancelar.is_set():
+                raise GeracaoCancelada()
+
+            renderizador.pagina(etiquetas, completa)
+            if progresso:
+                progresso(pagina, total)
+        desenho["paginas"] = pagina
+        desenho.update(renderizador.estatisticas())
+
+    with etapa("salvar"):
+        renderizador.fechar()
+    return pagina
+
+def _gravar_pdf(dados, pdf_path, progresso, cancelar, rotulos, **opcoes):
+    """
+    Desenha os dados com RenderizadorPDF(pdf_path, **opcoes) na etapa
+    gerar_pdf, com os rótulos da medida. Retorna (arquivos, páginas, bytes);
+    bytes é None quando pdf_path é um arquivo aberto.
+    """
+    renderizador = None
+    # Um arquivo já aberto pertence a quem chamou e não entra em parciais()
+    with _gravando_saida("PDF", lambda: renderizador.parciais() if renderizador else []):
+        with etapa("gerar_pdf", **rotulos) as medida:
+            renderizador = RenderizadorPDF(pdf_path, **opcoes)
+            medida["paginas"] = paginas = _renderizar(dados, renderizador, progresso, cancelar)
+            if hasattr(dados, "__len__"):
+                medida["linhas"] = len(dados)
+            tamanho = None
+            if isinstance(pdf_path, (str, os.PathLike)):
+                medida["bytes"] = tamanho = sum(map(os.path.getsize, renderizador.arquivos))
+    return renderizador.arquivos, paginas, tamanho
+
+def gerar_pdf(dados, pdf_path=None, usar_formularios=False, progresso=None, cancelar=None,
+              usar_cache_paginas=False, compressao=None, paginas_por_arquivo=None):
+    """
+    Gera o PDF das etiquetas. Aceita um DataFrame ou um gerador de registros
+    (ler_excel_streaming): cada página é desenhada e fechada assim que seus
+    registros chegam, sem manter a lista inteira em memória.
+    Sem pdf_path, salva na pasta padrão com um nome com data e hora.
+    Com usar_formularios, cada comunidade vira um Form XObject reutilizado.
+    progresso(paginas, total) é chamado a cada página (total é None quando
+    os dados vêm de um gerador). Se cancelar for acionado, o PDF parcial é
+    removido e GeracaoCancelada é lançada; o mesmo vale para qualquer falha.
+    Com usar_cache_paginas, páginas com os mesmos registros de uma geração
+    anterior (na mesma sessão) não são redesenhadas: o conteúdo guardado é
+    reaproveitado. Os formulários são próprios de cada documento e não usam
+    esse cache, nem os geradores, para manter a memória limitada a uma página.
+    compressao e paginas_por_arquivo: veja RenderizadorPDF. Retorna o
+    caminho do PDF (dividido em partes, o da primeira).
+    """
+    if pdf_path is None:
+        pdf_path = _caminho_com_data(".pdf")
+
+    rotulos = {"formularios": usar_formularios}
+    if compressao is not None:
+        rotulos["compressao"] = compressao
+    arquivos, _, _ = _gravar_pdf(
+        dados, pdf_path, progresso, cancelar, rotulos,
+        usar_formularios=usar_formularios,
+        usar_cache_paginas=usar_cache_paginas and hasattr(dados, "__len__"),
+        compressao=compressao, paginas_por_arquivo=paginas_por_arquivo
+    )
+    return arquivos[0]
+
+# =========================
+# PERFIS DE SAÍDA
+# =========================
+# compressao: veja RenderizadorPDF; formularios: a linha da comunidade é um
+# recurso compartilhado por todas as páginas; paginas_por_arquivo: divide
+# a saída em arquivos menores para envio por conexões lentas.
+PERFIS_SAIDA = {
+    "padrao": {"compressao": None, "formularios": False, "paginas_por_arquivo": None},
+    "rapido": {"compressao": 1, "formularios": False, "paginas_por_arquivo": None},
+    "compacto": {"compressao": 9, "formularios": True, "paginas_por_arquivo": None},
+    "sem_compressao": {"compressao": 0, "formularios": False, "paginas_por_arquivo": None},
+    "grafica": {"compressao": 9, "formularios": True, "paginas_por_arquivo": 500},
+}
+
+def gerar_pdf_perfil(dados, pdf_path=None, perfil="padrao", progresso=None, cancelar=None,
+                     **ajustes):
+    """
+    Gera o PDF com um dos PERFIS_SAIDA; ajustes (compressao, formularios,
+    paginas_por_arquivo) substituem os valores do perfil.
+    Retorna {"perfil", "arquivos", "bytes", "paginas", "segundos"}, para
+    comparar os perfis em cada trabalho.
+    """
+    if perfil not in PERFIS_SAIDA:
+        raise Exception(f"Perfil desconhecido: {perfil}. Use um de: {', '.join(PERFIS_SAIDA)}")
+    opcoes = {**PERFIS_SAIDA[perfil], **ajustes}
+
+    if pdf_path is None:
+        pdf_path = _caminho_com_data(".pdf")
+
+    inicio = time.perf_counter()
+    arquivos, paginas, tamanho = _gravar_pdf(
+        dados, pdf_path, progresso, cancelar,
+        {"perfil": perfil, "formularios": opcoes["formularios"], "compressao": opcoes["compressao"]},
+        usar_formularios=opcoes["formularios"], compressao=opcoes["compressao"],
+        paginas_por_arquivo=opcoes["paginas_por_arquivo"]
+    )
+
+    return {
+        "perfil": perfil,
+        "arquivos": arquivos,
+        "bytes": tamanho,
+        "paginas": paginas,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+# =========================
+# SAÍDA ZPL (impressora térmica)
+# =========================
+# Etiqueta do mesmo tamanho da Pimaco, uma por vez no rolo. O texto é
+# centralizado e quebrado pela própria impressora (^FB), então não há
+# medição de fontes nem desenho: só montagem de texto.
+DPI_ZPL = 203
+PORTA_ZPL = 9100  # porta "raw" das impressoras de rede
+
+# ^ e ~ são comandos ZPL; com ^FH, _XX insere o byte em hexadecimal
+_ESCAPE_ZPL = str.maketrans({"_": "_5F", "^": "_5E", "~": "_7E"})
+
+def _pontos_zpl(valor, dpi):
+    """Converte pontos PDF (1/72") em pontos da impressora"""
+    return round(valor * dpi / 72)
+
+def layout_zpl(dpi=DPI_ZPL):
+    """
+    Modelo de uma etiqueta em ZPL, com as mesmas distâncias do PDF medidas
+    a partir do topo da etiqueta. Campos: codigo, comunidade e nome.
+    """
+    largura = _pontos_zpl(ETIQUETA_LARGURA, dpi)
+    altura = _pontos_zpl(ETIQUETA_ALTURA, dpi)
+    margem = _pontos_zpl((ETIQUETA_LARGURA - LARGURA_NOME) / 2, dpi)
+    linha_base = 6 * MM  # distância do topo até a linha de base do código, como em calcular_slots
+
+    def campo(deslocamento, fonte, linhas, nome):
+        tamanho = fonte[1]
+        topo = _pontos_zpl(linha_base + deslocamento - tamanho, dpi)
+        altura_fonte = _pontos_zpl(tamanho, dpi)
+        entrelinha = _pontos_zpl(ENTRELINHA_NOME - tamanho, dpi) if linhas > 1 else 0
+        return (f"^FO{margem},{max(topo, 0)}^A0N,{altura_fonte},{altura_fonte}"
+                f"^FB{largura - 2 * margem},{linhas},{entrelinha},C^FH^FD{{{nome}}}^FS")
+
+    return (
+        f"^XA^CI28^PW{largura}^LL{altura}"
+        + campo(0, FONTE_CODIGO, 1, "codigo")
+        + campo(DESLOCAMENTO_COMUNIDADE, FONTE_COMUNIDADE, 1, "comunidade")
+        + campo(DESLOCAMENTO_NOME, FONTE_NOME, 2, "nome")
+        + "^XZ\n"
+    )
+
+class RenderizadorZPL:
+    """
+    Escreve uma etiqueta ZPL por registro preenchido, página a página, em
+    um arquivo binário aberto (arquivo comum, stdout ou socket.makefile).
+    As posições vazias da folha não existem no rolo e são ignoradas.
+    """
+    def __init__(self, arquivo, dpi=DPI_ZPL):
+        self.arquivo = arquivo
+        self.modelo = layout_zpl(dpi)
+        self.etiquetas = 0
+
+    def pagina(self, etiquetas, completa):
+        modelo = self.modelo
+        self.arquivo.write("".join(
+            modelo.format(
+                codigo=f"Nº {codigo}".translate(_ESCAPE_ZPL),
+                comunidade=str(comunidade).translate(_ESCAPE_ZPL),
+                nome=str(nome).translate(_ESCAPE_ZPL)
+            )
+            for slot, nome, codigo, comunidade in etiquetas
+        ).encode("utf-8"))
+        self.etiquetas += len(etiquetas)
+
+    def estatisticas(self):
+        return {"etiquetas": self.etiquetas}
+
+    def fechar(self):
+        self.arquivo.flush()
+
+def gerar_zpl(dados, destino=None, dpi=DPI_ZPL, progresso=None, cancelar=None):
+    """
+    Gera as etiquetas em ZPL. destino é um caminho (sem ele, a pasta padrão
+    com data e hora) ou um arquivo binário já aberto, que não é fechado.
+    progresso e cancelar funcionam como em gerar_pdf, contando folhas de
+    ETIQUETAS_POR_PAGINA registros. Retorna o destino.
+    """
+    if destino is None:
+        destino = _caminho_com_data(".zpl")
+
+    proprio = isinstance(destino, (str, os.PathLike))
+    temporario = _nome_temporario(destino) if proprio else None
+    with _gravando_saida("ZPL", lambda: [temporario] if proprio else []):
+        arquivo = open(temporario, "wb") if proprio else destino
+        try:
+            with etapa("gerar_zpl", dpi=dpi) as medida:
+                medida["paginas"] = _renderizar(dados, RenderizadorZPL(arquivo, dpi), progresso, cancelar)
+                if hasattr(dados, "__len__"):
+                    medida["linhas"] = len(dados)
+        finally:
+            if proprio:
+                arquivo.close()
+        if proprio:
+            os.replace(temporario, destino)
+    return destino
+
+def enviar_zpl(dados, host, porta=PORTA_ZPL, dpi=DPI_ZPL, progresso=None, cancelar=None,
+               tempo_limite=30):
+    """Envia o ZPL direto para a impressora de rede, página a página, sem arquivo"""
+    try:
+        conexao = socket.create_connection((host, porta), timeout=tempo_limite)
+    except OSError as e:
+        raise Exception(f"Não foi possível conectar à impressora {host}:{porta}: {e}")
+    with conexao, conexao.makefile("wb") as arquivo:
+        gerar_zpl(dados, arquivo, dpi, progresso, cancelar)
+
+# =========================
+# PRÉVIA (sem gerar o PDF)
+# =========================
+def etiquetas_da_pagina(dados, pagina):
+    """
+    [(slot, nome, código, comunidade)] de uma página (a partir de 0), lendo
+    só as linhas dela: a prévia não percorre os dados inteiros.
+    """
+    inicio = pagina * ETIQUETAS_POR_PAGINA
+    fim = inicio + ETIQUETAS_POR_PAGINA
+    fatia = dados.iloc[inicio:fim] if hasattr(dados, "columns") else dados[inicio:fim]
+    return [
+        (slot, nome, codigo, comunidade)
+        for slot, (nome, codigo, comunidade) in enumerate(_iterar_registros(fatia))
+        if nome or codigo or comunidade
+    ]
+
+def textos_pagina(etiquetas):
+    """
+    (x, y, texto, fonte) de cada texto da página, em pontos com origem no
+    canto inferior esquerdo, nas mesmas posições que _desenhar_pagina usa.
+    """
+    textos = []
+    for slot, nome, codigo, comunidade in etiquetas:
+        _, _, x_centro, linha_base = SLOTS[slot]
+        textos.append((x_centro, linha_base, f"Nº {codigo}", FONTE_CODIGO))
+        textos.append((x_centro, linha_base - DESLOCAMENTO_COMUNIDADE, comunidade, FONTE_COMUNIDADE))
+        for i, linha in enumerate(quebrar_texto(nome, *FONTE_NOME, LARGURA_NOME)[:2]):
+            textos.append((
+                x_centro, linha_base - DESLOCAMENTO_NOME - (i * ENTRELINHA_NOME), linha, FONTE_NOME
+            ))
+    return textos
+
+# =========================
+# PRÉ-CARREGAMENTO
+# =========================
+def _aquecer_pandas():
+    global pandas_loaded
+    import pandas
+    pandas_loaded = True
+
+def _aquecer_excel():
+    import openpyxl
+
+def _aquecer_pdf():
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import simpleSplit
+
+def _aquecer_fontes():
+    # Carrega as métricas (AFM) das fontes usadas nas etiquetas
+    from reportlab.pdfbase.pdfmetrics import getFont
+    for fonte, _ in (FONTE_CODIGO, FONTE_COMUNIDADE, FONTE_NOME):
+        getFont(fonte)
+
+ETAPAS_AQUECIMENTO = (
+    ("pandas", "Carregando pandas...", _aquecer_pandas),
+    ("openpyxl", "Carregando leitor de Excel...", _aquecer_excel),
+    ("reportlab", "Carregando módulos PDF...", _aquecer_pdf),
+    ("fontes", "Carregando métricas das fontes...", _aquecer_fontes),
+)
+
+def aquecer(progresso=None):
+    """
+    Importa antecipadamente as bibliotecas pesadas e as métricas das fontes,
+    para que a primeira geração não pague esse custo.
+    progresso(concluidas, total, descricao) é chamado antes de cada etapa e
+    ao final. Retorna o tempo de cada etapa em segundos.
+    """
+    tempos = {}
+    total = len(ETAPAS_AQUECIMENTO)
+    for indice, (chave, descricao, etapa) in enumerate(ETAPAS_AQUECIMENTO):
+        if progresso:
+            progresso(indice, total, descricao)
+        inicio = time.perf_counter()
+        etapa()
+        tempos[chave] = round(time.perf_counter() - inicio, 4)
+
+    if progresso:
+        progresso(total, total, "Sistema pronto!")
+    return tempos
+
+def compactar(dados):
+    """
+    Guarda a coluna COMUNIDADE como categórica: cada linha aponta para uma
+    pequena tabela com as poucas comunidades distintas, em vez de repetir o
+    texto em todas as linhas. Listas de Etiqueta são devolvidas sem mudança.
+    """
+    if not hasattr(dados, "columns") or dados["COMUNIDADE"].dtype == "category":
+        return dados
+
+    dados = dados.copy()
+    dados["COMUNIDADE"] = dados["COMUNIDADE"].astype("category")
+    return dados
+
+def renomear_comunidade(dados, antigo_nome, novo_nome):
+    """
+    Troca o nome de uma comunidade nos dados carregados e os retorna.
+    Com a coluna categórica, só a tabela de comunidades é renomeada.
+    """
+    if not hasattr(dados, "columns"):
+        return [
+            e._replace(comunidade=novo_nome) if e.comunidade == antigo_nome else e
+            for e in dados
+        ]
+
+    coluna = dados["COMUNIDADE"]
+    if coluna.dtype != "category":
+        dados.loc[coluna == antigo_nome, "COMUNIDADE"] = novo_nome
+        return dados
+
+    categorias = coluna.cat.categories
+    if antigo_nome not in categorias or antigo_nome == novo_nome:
+        return dados
+
+    if novo_nome not in categorias:
+        dados["COMUNIDADE"] = coluna.cat.rename_categories({antigo_nome: novo_nome})
+    else:
+        # As duas comunidades passam a ser uma só: os códigos precisam ser unidos
+        dados.loc[coluna == antigo_nome, "COMUNIDADE"] = novo_nome
+        dados["COMUNIDADE"] = dados["COMUNIDADE"].cat.remove_unused_categories()
+    return dados
+
+# =========================
+# NORMALIZAÇÃO DAS COMUNIDADES
+# =========================
+# Abreviações comuns nas planilhas, já sem acento e pontuação
+ABREVIACOES_COMUNIDADE = {
+    "S": "SAO", "STO": "SANTO", "STA": "SANTA", "SRA": "SENHORA",
+    "SR": "SENHOR", "NSA": "NOSSA", "NS": "NOSSA", "SGDO": "SAGRADO",
+    "CORAC": "CORACAO", "CAP": "CAPELA", "COM": "COMUNIDADE",
+}
+# Palavras que não distinguem uma comunidade de outra
+PALAVRAS_IGNORADAS_COMUNIDADE = {"CAPELA", "COMUNIDADE", "DE", "DA", "DO", "DAS", "DOS", "E"}
+SEMELHANCA_MINIMA_COMUNIDADE = 0.85
+
+def chave_comunidade(texto):
+    """Forma comparável do nome: sem acentos, pontuação e abreviações"""
+    texto = unicodedata.normalize("NFKD", str(texto).upper())
+    texto = texto.encode("ascii", "ignore").decode("ascii").replace("'", "")
+    palavras = [ABREVIACOES_COMUNIDADE.get(p, p) for p in re.findall(r"[A-Z0-9]+", texto)]
+    # "N. SRA." é Nossa Senhora; um N solto (RUA N) continua N
+    palavras = [
+        "NOSSA" if p == "N" and i + 1 < len(palavras) and palavras[i + 1] == "SENHORA" else p
+        for i, p in enumerate(palavras)
+    ]
+    return " ".join(p for p in palavras if p not in PALAVRAS_IGNORADAS_COMUNIDADE)
+
+@lru_cache(maxsize=8)
+def _indice_comunidades(capelas):
+    """{chave: comunidade} das capelas cadastradas (VAZIO não é comunidade)"""
+    return {chave_comunidade(c): c for c in capelas if c != "VAZIO"}
+
+def _corresponder_comunidade(valor, indice):
+    """
+    Comunidade cadastrada para um valor da planilha, ou None. Só o nome
+    inteiro é comparado: por semelhança, apenas com capelas de mesmo número
+    de palavras, para corrigir erros de digitação sem juntar "SAO JOSE 2"
+    ou "SAO JORGE II" à capela de nome mais curto.
+    """
+    chave = chave_comunidade(valor)
+    if not chave:
+        return None
+    if chave in indice:
+        return indice[chave]
+
+    palavras = len(chave.split())
+    mesmo_tamanho = [c for c in indice if len(c.split()) == palavras]
+    parecidas = difflib.get_close_matches(chave, mesmo_tamanho, n=2, cutoff=SEMELHANCA_MINIMA_COMUNIDADE)
+    if len(parecidas) == 1:
+        return indice[parecidas[0]]
+    return None  # nenhuma ou mais de uma parecida
+
+def _sugerir_comunidade(valor, indice):
+    """
+    Capela cujas palavras aparecem todas no valor, com outras a mais. Pode
+    ser a mesma comunidade escrita por extenso ou outra vizinha ("SANTA
+    CATARINA NORTE"), então só é sugerida, nunca aplicada.
+    """
+    palavras = set(chave_comunidade(valor).split())
+    candidatas = {
+        comunidade for chave_capela, comunidade in indice.items()
+        if set(chave_capela.split()) < palavras
+    }
+    return candidatas.pop() if len(candidatas) == 1 else None
+
+def normalizar_comunidades(dados, capelas=None):
+    """
+    Troca cada valor de COMUNIDADE pela capela cadastrada correspondente,
+    comparando nomes sem acentos e com abreviações expandidas e, por fim,
+    por semelhança do nome inteiro. Cada valor distinto é analisado uma única vez, então o
+    custo não cresce com o número de linhas. Valores sem correspondência
+    ficam como estão.
+    Retorna (dados, relatório), com o relatório em {"corrigidas": {valor:
+    capela}, "sem_correspondencia": {valor: linhas}, "sugestoes": {valor:
+    capela}}; as sugestões são valores sem correspondência que contêm o
+    nome de uma capela e mais palavras, e não são trocados.
+    """
+    indice = _indice_comunidades(tuple(CAPELAS if capelas is None else capelas))
+
+    if hasattr(dados, "columns"):
+        coluna = dados["COMUNIDADE"]
+        contagem = coluna.value_counts(sort=False)
+        distintos = [v for v, n in contagem.items() if n]
+    else:
+        contagem = {}
+        for e in dados:
+            contagem[e[2]] = contagem.get(e[2], 0) + 1
+        distintos = list(contagem)
+
+    mapa = {}
+    relatorio = {"corrigidas": {}, "sem_correspondencia": {}, "sugestoes": {}}
+    for valor in distintos:
+        if valor == "":
+            continue
+        comunidade = _corresponder_comunidade(valor, indice)
+        if comunidade is None:
+            relatorio["sem_correspondencia"][valor] = int(contagem[valor])
+            sugestao = _sugerir_comunidade(valor, indice)
+            if sugestao is not None:
+                relatorio["sugestoes"][valor] = sugestao
+        elif comunidade != valor:
+            mapa[valor] = comunidade
+            relatorio["corrigidas"][valor] = comunidade
+
+    if not mapa:
+        return dados, relatorio
+
+    if not hasattr(dados, "columns"):
+        return [
+            e._replace(comunidade=mapa[e[2]]) if e[2] in mapa else e
+            for e in map(Etiqueta._make, dados)
+        ], relatorio
+
+    dados = dados.copy()
+    if coluna.dtype != "category":
+        dados["COMUNIDADE"] = coluna.replace(mapa)
+        return dados, relatorio
+
+    # Só a tabela de categorias é percorrida; nomes que viram o mesmo se unem
+    import numpy as np
+    import pandas as pd
+
+    novas = [mapa.get(c, c) for c in coluna.cat.categories]
+    unicas = list(dict.fromkeys(novas))
+    posicao = {c: i for i, c in enumerate(unicas)}
+    tabela = np.array([posicao[c] for c in novas], dtype=coluna.cat.codes.dtype)
+    dados["COMUNIDADE"] = pd.Categorical.from_codes(tabela[coluna.cat.codes.to_numpy()], unicas)
+    return dados, relatorio
+
+# =========================
+# DEDUPLICAÇÃO E ORDENAÇÃO
+# =========================
+ORDENS = ("codigo", "nome")
+_SUFIXO_DECIMAL = re.compile(r"\.0+$")
+
+def normalizar_codigo(codigo):
+    """Código sem espaços nem o sufixo .0 de números lidos como decimais"""
+    codigo = str(codigo).strip()
+    return _SUFIXO_DECIMAL.sub("", codigo) if "." in codigo else codigo
+
+@lru_cache(maxsize=TAMANHO_CACHE_TEXTO)
+def _chave_texto(texto):
+    """Texto em maiúsculas, sem acentos e com espaços simples, para comparar e ordenar"""
+    texto = str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return " ".join(texto.upper().split())
+
+def _chave_codigo(codigo):
+    """Códigos numéricos em ordem numérica, antes dos demais; vazios no fim"""
+    if codigo.isdigit():
+        return (0, int(codigo), codigo)
+    return (1 if codigo else 2, 0, codigo)
+
+def _postos(valores):
+    """
+    Posição de cada valor na ordem de _chave_texto, calculando a chave só
+    dos valores distintos (poucas comunidades, mesmo com milhões de linhas).
+    """
+    import numpy as np
+    import pandas as pd
+
+    codigos, distintos = pd.factorize(valores)
+    chaves = [_chave_texto(v) for v in np.asarray(distintos, dtype=object)]
+    # Grafias com a mesma chave ("São José", "SAO JOSE") ficam no mesmo posto
+    posicao = {chave: i for i, chave in enumerate(sorted(set(chaves)))}
+    posto = np.array([posicao[chave] for chave in chaves], dtype=np.int64)
+    return posto[codigos]
+
+def _deduplicar_registros(dados, ordem, deduplicar):
+    """Versão de deduplicar_e_ordenar para listas de Etiqueta"""
+    vistos = {}
+    conflitos = {}
+    saida = []
+    removidas = vazias = 0
+
+    for etiqueta in map(Etiqueta._make, dados):
+        if not (etiqueta.nome or etiqueta.codigo or etiqueta.comunidade):
+            vazias += 1
+            continue
+        codigo = normalizar_codigo(etiqueta.codigo)
+        if deduplicar and codigo:
+            primeiro = vistos.get(codigo)
+            if primeiro is not None:
+                removidas += 1
+                chave = _chave_texto(etiqueta.nome)
+                if chave != _chave_texto(primeiro) or codigo in conflitos:
+                    nomes = conflitos.setdefault(codigo, {_chave_texto(primeiro): primeiro})
+                    nomes.setdefault(chave, etiqueta.nome)
+                continue
+            vistos[codigo] = etiqueta.nome
+        saida.append(etiqueta._replace(codigo=codigo))
+
+    if ordem == "codigo":
+        saida.sort(key=lambda e: (_chave_texto(e.comunidade), _chave_codigo(e.codigo)))
+    elif ordem == "nome":
+        saida.sort(key=lambda e: (_chave_texto(e.comunidade), _chave_texto(e.nome)))
+
+    conflitos = {codigo: list(nomes.values()) for codigo, nomes in conflitos.items()}
+    return saida, {"removidas": removidas, "vazias": vazias, "conflitos": conflitos}
+
+def deduplicar_e_ordenar(dados, ordem="codigo", deduplicar=True):
+    """
+    Etapa opcional entre a leitura e gerar_pdf, para listas de várias
+    comunidades juntas. Normaliza os códigos (sem espaços nem ".0"), mantém
+    só a primeira linha de cada código (índice de hash; linhas sem código
+    nunca são removidas), descarta as linhas vazias e ordena de forma
+    estável por comunidade e depois por código (numérico) ou nome.
+    ordem=None mantém a ordem original.
+    Retorna (dados, relatório), com o relatório em {"removidas": n,
+    "vazias": n, "conflitos": {código: [nomes diferentes com esse código]}}.
+    """
+    if ordem is not None and ordem not in ORDENS:
+        raise Exception(f"Ordem desconhecida: {ordem}. Use {' ou '.join(ORDENS)}.")
+
+    with etapa("deduplicar_ordenar", ordem=ordem) as medida:
+        if not hasattr(dados, "columns"):
+            dados, relatorio = _deduplicar_registros(dados, ordem, deduplicar)
+        else:
+            dados, relatorio = _deduplicar_dataframe(dados, ordem, deduplicar)
+        medida.update(linhas=len(dados), removidas=relatorio["removidas"],
+                      conflitos=len(relatorio["conflitos"]))
+    return dados, relatorio
+
+def _deduplicar_dataframe(dados, ordem, deduplicar):
+    """
+    Versão vetorizada: pd.factorize monta o índice de hash dos códigos, e o
+    trabalho em Python (normalizar, chaves de ordenação) é feito só uma vez
+    por valor distinto; por linha, só operações do NumPy com inteiros.
+    """
+    import numpy as np
+    import pandas as pd
+
+    brutos, distintos = pd.factorize(dados["CÓDIGO DIZIMISTA"])
+    distintos = np.asarray(distintos, dtype=object).tolist()
+    normalizados = [normalizar_codigo(c) for c in distintos]
+    ids_distintos, unicos = pd.factorize(np.array(normalizados + [""], dtype=object))
+    ids = ids_distintos[brutos]             # código normalizado de cada linha
+    unicos = np.asarray(unicos, dtype=object)
+    id_vazio = ids_distintos[-1]
+
+    com_codigo = ids != id_vazio
+    vazias = ~com_codigo & (dados["NOME"] == "").to_numpy() & (dados["COMUNIDADE"] == "").to_numpy()
+
+    conflitos = {}
+    manter = ~vazias
+    removidas = 0
+    if deduplicar:
+        repetidas = pd.Series(ids).duplicated().to_numpy() & com_codigo
+        removidas = int(repetidas.sum())
+        manter &= ~repetidas
+
+        if removidas:
+            conflitos = _conflitos_codigos(dados["NOME"], ids, com_codigo, unicos)
+
+    dados = dados[manter]
+    ids = ids[manter]
+    if normalizados != distintos:
+        dados = dados.copy()
+        dados["CÓDIGO DIZIMISTA"] = pd.array(unicos[ids], dtype=dados["CÓDIGO DIZIMISTA"].dtype)
+
+    if ordem is not None:
+        postos_comunidade = _postos(dados["COMUNIDADE"])
+        if ordem == "codigo":
+            # np.lexsort é estável e usa a última chave como a principal
+            indices = np.lexsort((_postos_codigos(unicos)[ids], postos_comunidade))
+        else:
+            indices = np.lexsort((_postos(dados["NOME"]), postos_comunidade))
+        dados = dados.iloc[indices]
+
+    return dados.reset_index(drop=True), {
+        "removidas": removidas, "vazias": int(vazias.sum()), "conflitos": conflitos
+    }
+
+def _postos_codigos(unicos):
+    """
+    Posição de cada código distinto na ordem de _chave_codigo: números em
+    ordem numérica, depois os demais em ordem de texto, vazios no fim.
+    """
+    import numpy as np
+    import pandas as pd
+
+    grupos = np.array([0 if c.isdigit() else (1 if c else 2) for c in unicos], dtype=np.int8)
+    numericos = grupos == 0
+
+    # Ordem numérica exata, sem float (que perde a ordem acima de 2**53):
+    # sem os zeros à esquerda, o número de menos dígitos é o menor. Até 18
+    # dígitos o valor cabe em int64; acima disso, com os mesmos dígitos, a
+    # ordem de texto é a numérica
+    textos = unicos[numericos]
+    tamanhos = np.array([len(c.lstrip("0")) for c in textos], dtype=np.int64)
+    curtos = tamanhos <= 18
+    valores = np.zeros(len(textos), dtype=np.int64)
+    valores[curtos] = textos[curtos].astype(np.int64)
+    valores[~curtos] = pd.factorize(
+        np.array([c.lstrip("0") for c in textos[~curtos]], dtype=object), sort=True
+    )[0]
+    digitos = np.zeros(len(unicos), dtype=np.int64)
+    digitos[numericos] = tamanhos
+    numeros = np.zeros(len(unicos), dtype=np.int64)
+    numeros[numericos] = valores
+
+    # Desempate em ordem de texto: entre números iguais ("012" e "12"), o
+    # de mais zeros à esquerda vem antes; os demais códigos são ordenados
+    # só entre si, sem ordenar os milhares de códigos numéricos como texto
+    postos_texto = np.zeros(len(unicos), dtype=np.int64)
+    postos_texto[numericos] = [-len(c) for c in unicos[numericos]]
+    postos_texto[grupos == 1] = pd.factorize(unicos[grupos == 1], sort=True)[0]
+
+    postos = np.empty(len(unicos), dtype=np.int64)
+    postos[np.lexsort((postos_texto, numeros, digitos, grupos))] = np.arange(len(unicos))
+    return postos
+
+def _conflitos_codigos(nomes, ids, com_codigo, unicos):
+    """{código: [nomes]} dos códigos repetidos com nomes diferentes (uma grafia por nome)"""
+    import numpy as np
+    import pandas as pd
+
+    repetidos = pd.Series(ids).duplicated(keep=False).to_numpy() & com_codigo
+    nomes = nomes[repetidos]
+    ids = ids[repetidos]
+    codigos_nome, distintos = pd.factorize(nomes)
+    chaves = [_chave_texto(n) for n in np.asarray(distintos, dtype=object)]
+    postos_nome = pd.factorize(np.array(chaves, dtype=object))[0]
+
+    pares = pd.DataFrame({"id": ids, "nome": postos_nome[codigos_nome]}).drop_duplicates()
+    em_conflito = pares[pares["id"].duplicated(keep=False)]
+
+    conflitos = {}
+    lista_nomes = nomes.to_numpy(dtype=object)
+    for linha, codigo in zip(em_conflito.index.tolist(), em_conflito["id"].tolist()):
+        conflitos.setdefault(unicos[codigo], []).append(lista_nomes[linha])
+    return conflitos
+
+# =========================
+# GERAÇÃO EM LOTE (por comunidade)
+# =========================
+def nome_arquivo_comunidade(comunidade):
+    """Nome de arquivo seguro para a comunidade, sem acentos nem pontuação"""
+    texto = unicodedata.normalize("NFKD", comunidade)
+    texto = texto.encode("ascii", "ignore").decode("ascii")
+    texto = re.sub(r"[^A-Za-z0-9]+", "_", texto).strip("_").lower()
+    return f"etiquetas_{texto or 'sem_comunidade'}.pdf"
+
+def _nome_unico(arquivo, usados):
+    """Acrescenta _2, _3... para que nomes que diferem só por acentos não se sobrescrevam"""
+    base, n = arquivo[:-4], 2
+    while arquivo in usados:
+        arquivo = f"{base}_{n}.pdf"
+        n += 1
+    usados.add(arquivo)
+    return arquivo
+
+def _gerar_pdf_comunidade(tarefa):
+    """Executado em um processo separado: gera o PDF de uma comunidade"""
+    comunidade, dados, pdf_path, usar_formularios = tarefa
+    inicio = time.perf_counter()
+    gerar_pdf(dados, pdf_path=pdf_path, usar_formularios=usar_formularios)
+    return {
+        "comunidade": comunidade,
+        "arquivo": os.path.basename(pdf_path),
+        "etiquetas": len(dados),
+        "paginas": -(-len(dados) // ETIQUETAS_POR_PAGINA),
+        "segundos": round(time.perf_counter() - inicio, 3)
+    }
+
+def gerar_pdf_por_comunidade(dados, pasta_saida, processos=None, usar_formularios=False):
+    """
+    Gera um PDF por comunidade, cada um em um processo separado, e grava
+    manifesto.json na pasta de saída. Cada grupo mantém a ordem original
+    das linhas; linhas totalmente vazias (só ocupavam posição na folha)
+    são descartadas. Retorna a lista do manifesto.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    dados = para_dataframe(dados)
+    preenchidas = (
+        (dados["NOME"] != "") | (dados["CÓDIGO DIZIMISTA"] != "") | (dados["COMUNIDADE"] != "")
+    )
+    dados = dados[preenchidas]
+
+    os.makedirs(pasta_saida, exist_ok=True)
+    tarefas = []
+    usados = set()
+    for comunidade, grupo in dados.groupby("COMUNIDADE", sort=False, observed=True):
+        arquivo = _nome_unico(nome_arquivo_comunidade(comunidade), usados)
+
+        tarefas.append((
+            comunidade,
+            grupo.reset_index(drop=True),
+            os.path.join(pasta_saida, arquivo),
+            usar_formularios
+        ))
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        manifesto = list(executor.map(_gerar_pdf_comunidade, tarefas))
+
+    with open(os.path.join(pasta_saida, "manifesto.json"), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    return manifesto
+
+# =========================
+# GERAÇÃO EM PARTES (paralela) E JUNÇÃO DE PDFs
+# =========================
+_REF_OBJETO = re.compile(rb"(\d+) 0 R")
+_TAMANHO_STREAM = re.compile(rb"/Length (\d+)")
+
+def _ler_objetos_pdf(dados_pdf):
+    """
+    Lê os objetos de um PDF gerado pelo ReportLab pela tabela xref.
+    Retorna ({número: (dicionário, stream ou None)}, trailer).
+    """
+    inicio_xref = int(dados_pdf[dados_pdf.rindex(b"startxref") + 9:].split()[0])
+    fim_xref = dados_pdf.index(b"trailer", inicio_xref)
+    linhas = dados_pdf[inicio_xref:fim_xref].split(b"\n")[1:]
+
+    primeiro, quantidade = (int(v) for v in linhas[0].split())
+    objetos = {}
+    for numero, linha in enumerate(linhas[1:1 + quantidade], start=primeiro):
+        deslocamento, _, tipo = linha.split()[:3]
+        if tipo != b"n":
+            continue
+
+        inicio = dados_pdf.index(b"obj", int(deslocamento)) + 3
+        fim = dados_pdf.index(b"endobj", inicio)
+        corpo = dados_pdf[inicio:fim]
+        posicao_stream = corpo.find(b"stream")
+        if posicao_stream < 0 or b">>" not in corpo[:posicao_stream]:
+            objetos[numero] = (corpo.strip(), None)
+            continue
+
+        # O stream pode conter qualquer byte: usa o /Length, não procura "endobj"
+        dicionario = corpo[:posicao_stream]
+        tamanho = int(_TAMANHO_STREAM.search(dicionario).group(1))
+        inicio_stream = inicio + posicao_stream + 6
+        if dados_pdf[inicio_stream:inicio_stream + 1] == b"\r":
+            inicio_stream += 1
+        inicio_stream += 1
+        stream = dados_pdf[inicio_stream:inicio_stream + tamanho]
+        objetos[numero] = (dicionario.strip(), stream)
+
+    trailer = dados_pdf[fim_xref:dados_pdf.rindex(b"startxref")]
+    return objetos, trailer
+
+def _referencia(texto, chave):
+    """Número do objeto referenciado por /chave no texto"""
+    return int(re.search(rb"/" + chave + rb" (\d+) 0 R", texto).group(1))
+
+def concatenar_pdfs(caminhos, destino):
+    """
+    Junta PDFs gerados pelo ReportLab em um único arquivo, sem dependências
+    externas: renumera os objetos de cada arquivo e monta uma nova árvore
+    de páginas com as páginas de todos eles, na ordem recebida.
+    """
+    saida = []        # (dicionário, stream) na ordem dos novos números
+    paginas = []
+    numero_paginas = 1  # o objeto 1 é a nova árvore de páginas, o 2 o catálogo
+
+    for caminho in caminhos:
+        with open(caminho, "rb") as f:
+            objetos, trailer = _ler_objetos_pdf(f.read())
+
+        raiz = _referencia(trailer, b"Root")
+        info = _referencia(trailer, b"Info")
+        arvore = _referencia(objetos[raiz][0], b"Pages")
+
+        novos = {arvore: numero_paginas}
+        proximo = len(saida) + 3
+        for numero in sorted(objetos):
+            if numero not in (raiz, info, arvore):
+                novos[numero] = proximo
+                proximo += 1
+
+        def renumerar(m):
+            return b"%d 0 R" % novos[int(m.group(1))]
+
+        for numero in sorted(objetos):
+            if numero in (raiz, info, arvore):
+                continue
+            dicionario, stream = objetos[numero]
+            saida.append((_REF_OBJETO.sub(renumerar, dicionario), stream))
+
+        kids = re.search(rb"/Kids \[(.*?)\]", objetos[arvore][0], re.S).group(1)
+        paginas.extend(novos[int(n)] for n in _REF_OBJETO.findall(kids))
+
+    kids = b" ".join(b"%d 0 R" % n for n in paginas)
+    saida.insert(0, (b"<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>" % (len(paginas), kids), None))
+    saida.insert(1, (b"<<\n/PageMode /UseNone /Pages 1 0 R /Type /Catalog\n>>", None))
+
+    with open(destino, "wb") as f:
+        f.write(b"%PDF-1.3\n%\x93\x8c\x8b\x9e\n")
+        deslocamentos = []
+        for numero, (dicionario, stream) in enumerate(saida, start=1):
+            deslocamentos.append(f.tell())
+            f.write(b"%d 0 obj\n" % numero + dicionario)
+            if stream is not None:
+                f.write(b"\nstream\n" + stream + b"\nendstream")
+            f.write(b"\nendobj\n")
+
+        inicio_xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(saida) + 1))
+        for deslocamento in deslocamentos:
+            f.write(b"%010d 00000 n \n" % deslocamento)
+        f.write(
+            b"trailer\n<<\n/Root 2 0 R\n/Size %d\n>>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(saida) + 1, inicio_xref)
+        )
+
+    return destino
+
+def _gerar_pdf_parte(tarefa):
+    """Executado em um processo separado: gera o PDF de uma parte das páginas"""
+    dados, pdf_path, usar_formularios = tarefa
+    return gerar_pdf(dados, pdf_path=pdf_path, usar_formularios=usar_formularios)
+
+def gerar_pdf_paralelo(dados, pdf_path=None, processos=None, usar_formularios=False):
+    """
+    Gera um único PDF dividindo as etiquetas em partes de páginas inteiras
+    (múltiplos de COLUNAS * LINHAS, para que cada registro continue no mesmo
+    slot, inclusive as posições vazias da entrada manual), desenhando as
+    partes em processos paralelos e juntando-as no final.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    processos = processos or os.cpu_count() or 1
+    total_paginas = -(-len(dados) // ETIQUETAS_POR_PAGINA)
+    if processos == 1 or total_paginas < 2:
+        return gerar_pdf(dados, pdf_path=pdf_path, usar_formularios=usar_formularios)
+
+    if pdf_path is None:
+        pdf_path = _caminho_com_data(".pdf")
+
+    # Algumas partes a mais que processos equilibram partes mais lentas
+    paginas_por_parte = max(1, -(-total_paginas // (processos * 2)))
+    tamanho_parte = paginas_por_parte * ETIQUETAS_POR_PAGINA
+    fatiar = dados.iloc.__getitem__ if hasattr(dados, "columns") else dados.__getitem__
+
+    with tempfile.TemporaryDirectory() as pasta:
+        tarefas = [
+            (
+                fatiar(slice(inicio, inicio + tamanho_parte)),
+                os.path.join(pasta, f"parte_{indice:05d}.pdf"),
+                usar_formularios
+            )
+            for indice, inicio in enumerate(range(0, len(dados), tamanho_parte))
+        ]
+
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            partes = list(executor.map(_gerar_pdf_parte, tarefas))
+
+        temporario = _nome_temporario(pdf_path)
+        with _gravando_saida("PDF", lambda: [temporario]):
+            concatenar_pdfs(partes, temporario)
+            os.replace(temporario, pdf_path)
+
+    return pdf_path
+
+# =========================
+# LOTE DE PLANILHAS (várias abas e arquivos)
+# =========================
+EXTENSOES_LOTE = (".xlsx", ".xls", ".csv", ".tsv")
+
+def listar_arquivos_lote(entrada):
+    """Planilhas de uma pasta ou de um padrão glob, em ordem de nome"""
+    if os.path.isdir(entrada):
+        caminhos = [os.path.join(entrada, nome) for nome in os.listdir(entrada)]
+    else:
+        caminhos = glob.glob(entrada)
+
+    caminhos = sorted(
+        c for c in caminhos
+        if os.path.isfile(c)
+        and os.path.splitext(c)[1].lower() in EXTENSOES_LOTE
+        and not os.path.basename(c).startswith("~$")  # arquivo de trava do Excel
+    )
+    if not caminhos:
+        raise Exception(f"Nenhuma planilha encontrada em: {entrada}")
+    return caminhos
+
+def descobrir_abas(caminho):
+    """
+    Nomes das abas que têm cabeçalho com NOME, CÓDIGO e COMUNIDADE.
+    CSV/TSV têm uma única "aba", representada por None.
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+    abas = []
+
+    if extensao in EXTENSOES_TEXTO:
+        try:
+            arquivo, _, _ = _abrir_csv(caminho)
+        except (OSError, csv.Error):
+            raise
+        except Exception:
+            return abas  # sem cabeçalho com NOME: não é uma lista
+        arquivo.close()
+        abas.append(None)
+    elif extensao == ".xls":
+        global pandas_loaded
+        if not pandas_loaded:
+            import pandas as pd
+            pandas_loaded = True
+        else:
+            import pandas as pd
+
+        inicio = pd.read_excel(
+            caminho, sheet_name=None, header=None, nrows=LINHAS_BUSCA_CABECALHO
+        )
+        for nome, df in inicio.items():
+            try:
+                _localizar_cabecalho(df.itertuples(index=False, name=None))
+                abas.append(nome)
+            except Exception:
+                pass
+    else:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            for planilha in wb.worksheets:
+                try:
+                    _localizar_cabecalho(planilha.iter_rows(values_only=True))
+                    abas.append(planilha.title)
+                except Exception:
+                    pass
+        finally:
+            wb.close()
+
+    return abas
+
+def _descobrir_abas_lote(caminho):
+    """Executado em um processo separado: (abas, None) ou ([], erro) se o arquivo não abrir"""
+    try:
+        return descobrir_abas(caminho), None
+    except Exception as e:
+        return [], str(e) or type(e).__name__
+
+def _ler_aba_lote(tarefa):
+    """Executado em um processo separado: (colunas, None) ou (None, erro)"""
+    try:
+        return _ler_aba(tarefa), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+def _ler_aba(tarefa):
+    """Lê uma aba e devolve as três colunas; os erros ficam para _ler_aba_lote"""
+    caminho, aba = tarefa
+    if os.path.splitext(caminho)[1].lower() == ".xls":
+        df = _ler_excel_pandas(caminho, aba)
+        return [df[c].tolist() for c in COLUNAS_DATAFRAME]
+
+    colunas = ([], [], [])
+    for linha in _linhas_planilha(*_abrir_arquivo(caminho, aba)):
+        for coluna, valor in zip(colunas, linha):
+            coluna.append(valor)
+    return colunas
+
+def gerar_lote(entrada, pasta_saida=None, por_origem=False, processos=None,
+               usar_formularios=False):
+    """
+    Lê, em processos paralelos, todas as abas com cabeçalho NOME das
+    planilhas de uma pasta (ou padrão glob) e gera um único PDF com todas,
+    na ordem de arquivo e aba, ou um PDF por aba com por_origem=True.
+    Grava resumo_lote.json na pasta de saída e retorna o resumo, com as
+    linhas e páginas de cada aba. Arquivos ou abas que não puderem ser lidos
+    são pulados e aparecem no resumo com o campo "erro".
+    """
+    # As leituras e os PDFs são medidos nos processos do pool; aqui fica o total
+    with etapa("gerar_lote", por_origem=por_origem) as medida:
+        resumo = _gerar_lote(entrada, pasta_saida, por_origem, processos, usar_formularios)
+        lidas = [item for item in resumo if "erro" not in item]
+        medida.update(abas=len(lidas), linhas=sum(item["linhas"] for item in lidas),
+                      falhas=len(resumo) - len(lidas))
+    return resumo
+
+def _gerar_lote(entrada, pasta_saida, por_origem, processos, usar_formularios):
+    from concurrent.futures import ProcessPoolExecutor
+
+    arquivos = listar_arquivos_lote(entrada)
+    pasta_saida = pasta_saida or pasta_saida_padrao()
+    os.makedirs(pasta_saida, exist_ok=True)
+
+    falhas = []
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        abas = []
+        for caminho, (nomes, erro) in zip(arquivos, executor.map(_descobrir_abas_lote, arquivos)):
+            if erro is not None:
+                falhas.append((caminho, None, erro))
+            abas.extend((caminho, aba) for aba in nomes)
+
+        lidas = []
+        registros = []
+        for (caminho, aba), (colunas, erro) in zip(abas, executor.map(_ler_aba_lote, abas)):
+            if erro is not None:
+                falhas.append((caminho, aba, erro))
+                continue
+            lidas.append((caminho, aba))
+            registros.append(list(zip(*colunas)))
+        abas = lidas
+        if not abas:
+            detalhe = "".join(f"\n{os.path.basename(c)}: {e}" for c, _, e in falhas)
+            raise Exception(f"Nenhuma aba com cabeçalho 'NOME' encontrada.{detalhe}")
+
+        resumo = []
+        if por_origem:
+            tarefas = []
+            usados = set()
+            for (caminho, aba), dados in zip(abas, registros):
+                origem = os.path.splitext(os.path.basename(caminho))[0]
+                if aba is not None:
+                    origem = f"{origem} {aba}"
+                pdf_path = os.path.join(
+                    pasta_saida, _nome_unico(nome_arquivo_comunidade(origem), usados)
+                )
+                tarefas.append((dados, pdf_path, usar_formularios))
+                resumo.append({
+                    "arquivo": os.path.basename(caminho),
+                    "aba": aba or "",
+                    "linhas": len(dados),
+                    "paginas": -(-len(dados) // ETIQUETAS_POR_PAGINA),
+                    "pdf": os.path.basename(pdf_path)
+                })
+            list(executor.map(_gerar_pdf_parte, tarefas))
+
+    if not por_origem:
+        pdf_path = _caminho_com_data(".pdf", pasta_saida, "etiquetas_lote")
+        inicio = 0
+        for (caminho, aba), dados in zip(abas, registros):
+            # Páginas do PDF único em que as etiquetas desta aba aparecem
+            paginas = 0
+            if dados:
+                paginas = (
+                    (inicio + len(dados) - 1) // ETIQUETAS_POR_PAGINA
+                    - inicio // ETIQUETAS_POR_PAGINA + 1
+                )
+            resumo.append({
+                "arquivo": os.path.basename(caminho),
+                "aba": aba or "",
+                "linhas": len(dados),
+                "paginas": paginas,
+                "pdf": os.path.basename(pdf_path)
+            })
+            inicio += len(dados)
+
+        todos = [registro for dados in registros for registro in dados]
+        gerar_pdf_paralelo(
+            todos, pdf_path=pdf_path,
+            processos=processos, usar_formularios=usar_formularios
+        )
+
+    for caminho, aba, erro in falhas:
+        resumo.append({
+            "arquivo": os.path.basename(caminho),
+            "aba": aba or "",
+            "linhas": 0,
+            "paginas": 0,
+            "pdf": "",
+            "erro": erro
+        })
+
+    with open(os.path.join(pasta_saida, "resumo_lote.json"), "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+    return resumo
@@ -0,0 +1,273 @@
+"""
+Serviço HTTP local do gerador de etiquetas, só com a biblioteca padrão.
+
+Os processos de trabalho carregam pandas, openpyxl e reportlab uma única
+vez, ao iniciar; cada pedido só lê os dados e desenha o PDF.
+
+    POST /etiquetas               corpo: planilha (.xlsx, .xls, .csv, .tsv)
+                                  ou texto da entrada manual (text/plain)
+         ?formato=xlsx            quando o Content-Type não indicar o tipo
+         ?capela=MATRIZ           comunidade da entrada manual
+         ?formularios=1           usa formulários para a linha da comunidade
+    GET  /saude                   processos, vagas e pedidos atendidos (JSON)
+
+Exemplos:
+    python servidor.py --porta 8765 --processos 4 --fila 16
+    curl --data-binary @lista.xlsx -H "Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" \\
+         http://127.0.0.1:8765/etiquetas -o etiquetas.pdf
+    python benchmark.py --carga http://127.0.0.1:8765 --requisicoes 200 --concorrencia 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Tipo de conteúdo -> formato do corpo enviado
+FORMATOS_POR_TIPO = {
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+    "application/vnd.ms-excel": "xls",
+    "text/csv": "csv",
+    "text/tab-separated-values": "tsv",
+    "text/plain": "manual",
+}
+FORMATOS_ACEITOS = {"xlsx", "xls", "csv", "tsv", "manual"}
+
+TAMANHO_MAXIMO_ENVIO = 50 * 1024 * 1024  # bytes
+TEMPO_MAXIMO_PEDIDO = 300                # segundos até desistir de um pedido
+
+
+class DadosInvalidos(Exception):
+    """O corpo enviado não pôde ser lido como lista de etiquetas (resposta 400)"""
+
+
+def _aquecer_trabalhador():
+    """Inicializador de cada processo do pool: deixa os imports prontos"""
+    import etiquetas
+    etiquetas.aquecer()
+
+
+def _pronto():
+    return os.getpid()
+
+
+def _gerar_no_trabalhador(formato, corpo, capela, usar_formularios):
+    """
+    Executado no pool: lê os dados enviados e devolve os bytes do PDF.
+    Erros de leitura voltam como DadosInvalidos; os da geração, como vierem.
+    """
+    import etiquetas
+
+    etiquetas.limpar_metricas()  # o processo atende muitos pedidos
+    with tempfile.TemporaryDirectory() as pasta:
+        try:
+            if formato == "manual":
+                dados = etiquetas.ler_manual(corpo.decode("utf-8", errors="replace"), capela)
+            else:
+                caminho = os.path.join(pasta, f"lista.{formato}")
+                with open(caminho, "wb") as f:
+                    f.write(corpo)
+                dados = etiquetas.ler_excel(caminho)
+        except Exception as e:
+            raise DadosInvalidos(str(e)) from None
+
+        pdf_path = etiquetas.gerar_pdf(
+            dados, pdf_path=os.path.join(pasta, "etiquetas.pdf"),
+            usar_formularios=usar_formularios
+        )
+        with open(pdf_path, "rb") as f:
+            return f.read()
+
+
+class ServicoEtiquetas(ThreadingHTTPServer):
+    """
+    Servidor com um pool de processos já aquecidos. No máximo `processos`
+    pedidos são desenhados ao mesmo tempo e até `fila` esperam a vez; além
+    disso o pedido é recusado na hora com 503, em vez de acumular. Um pedido
+    que estoura o tempo continua ocupando a vaga até o processo terminar.
+    Se um processo morrer, o pool é recriado para os próximos pedidos.
+    """
+    daemon_threads = True
+
+    def __init__(self, endereco, processos, fila, silencioso=False):
+        super().__init__(endereco, TratadorEtiquetas)
+        self.processos = processos
+        self.fila = fila
+        self.silencioso = silencioso
+        self.vagas = threading.BoundedSemaphore(processos + fila)
+        self.trava = threading.Lock()
+        self.ocupadas = 0
+        self.atendidos = 0
+        self.trava_pool = threading.Lock()
+        self.pool = self._criar_pool()
+
+    def _criar_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.processos, initializer=_aquecer_trabalhador)
+        # Sobe todos os processos agora, para o primeiro pedido já encontrá-los prontos
+        futuros = [pool.submit(_pronto) for _ in range(self.processos)]
+        for futuro in futuros:
+            futuro.result()
+        return pool
+
+    def recriar_pool(self, quebrado):
+        """Troca o pool quebrado por um novo; vários pedidos podem notar a mesma quebra"""
+        with self.trava_pool:
+            if self.pool is not quebrado:
+                return
+            quebrado.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._criar_pool()
+
+    def liberar_vaga(self, _futuro=None):
+        with self.trava:
+            self.ocupadas -= 1
+        self.vagas.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+    def estado(self):
+        with self.trava:
+            return {
+                "processos": self.processos,
+                "fila": self.fila,
+                "ocupadas": self.ocupadas,
+                "atendidos": self.atendidos,
+            }
+
+
+class TratadorEtiquetas(BaseHTTPRequestHandler):
+    server_version = "GeradorEtiquetas/1.0"
+
+    def log_message(self, formato, *args):
+        if not self.server.silencioso:
+            super().log_message(formato, *args)
+
+    def _responder(self, codigo, corpo, tipo="text/plain; charset=utf-8", cabecalhos=None):
+        if isinstance(corpo, str):
+            corpo = corpo.encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/saude":
+            self._responder(404, "Não encontrado.")
+            return
+        self._responder(200, json.dumps(self.server.estado()), "application/json")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/etiquetas":
+            self._responder(404, "Não encontrado.")
+            return
+
+        parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        tipo = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        formato = parametros.get("formato", FORMATOS_POR_TIPO.get(tipo, "")).lower()
+        if formato not in FORMATOS_ACEITOS:
+            self._responder(415, "Envie uma planilha (.xlsx, .xls, .csv, .tsv) ou texto da entrada manual.")
+            return
+
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            tamanho = -1
+        if tamanho < 0:
+            self._responder(400, "Content-Length inválido.")
+            return
+        if tamanho <= 0:
+            self._responder(400, "Corpo do pedido vazio.")
+            return
+        if tamanho > TAMANHO_MAXIMO_ENVIO:
+            self._responder(413, "Arquivo muito grande.")
+            return
+        corpo = self.rfile.read(tamanho)
+
+        servidor = self.server
+        if not servidor.vagas.acquire(blocking=False):
+            self._responder(503, "Servidor ocupado, tente novamente.", cabecalhos={"Retry-After": "1"})
+            return
+
+        with servidor.trava:
+            servidor.ocupadas += 1
+        pool = servidor.pool
+        try:
+            futuro = pool.submit(
+                _gerar_no_trabalhador, formato, corpo,
+                parametros.get("capela", ""), parametros.get("formularios") == "1"
+            )
+        except Exception as e:
+            servidor.liberar_vaga()
+            self._falha_do_pool(pool, e)
+            return
+        # A vaga só volta quando o processo termina, mesmo depois de um 504
+        futuro.add_done_callback(servidor.liberar_vaga)
+
+        try:
+            pdf = futuro.result(timeout=TEMPO_MAXIMO_PEDIDO)
+        except TempoEsgotado:
+            futuro.cancel()
+            self._responder(504, "A geração demorou demais.")
+            return
+        except DadosInvalidos as e:
+            self._responder(400, f"Erro: {e}")
+            return
+        except Exception as e:
+            self._falha_do_pool(pool, e)
+            return
+
+        with servidor.trava:
+            servidor.atendidos += 1
+        self._responder(200, pdf, "application/pdf",
+                        {"Content-Disposition": 'attachment; filename="etiquetas.pdf"'})
+
+
+    def _falha_do_pool(self, pool, erro):
+        """Falhas do servidor, e não do arquivo enviado: 503 se o pool quebrou, senão 500"""
+        if isinstance(erro, BrokenProcessPool):
+            self.server.recriar_pool(pool)
+            self._responder(503, "Processo de geração interrompido, tente novamente.",
+                            cabecalhos={"Retry-After": "1"})
+        else:
+            self._responder(500, f"Erro interno: {erro}")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Serviço HTTP local do gerador de etiquetas.")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço de escuta (padrão: 127.0.0.1)")
+    parser.add_argument("--porta", type=int, default=8765, help="porta (padrão: 8765)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="processos que geram PDFs ao mesmo tempo (padrão: núcleos)")
+    parser.add_argument("--fila", type=int, default=16,
+                        help="pedidos que podem esperar por um processo livre (padrão: 16)")
+    parser.add_argument("--silencioso", action="store_true", help="não registra cada pedido")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+
+    print(f"Aquecendo {args.processos} processo(s)...", file=sys.stderr)
+    servidor = ServicoEtiquetas((args.host, args.porta), args.processos, args.fila, args.silencioso)
+    print(f"Atendendo em http://{args.host}:{args.porta}/etiquetas", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
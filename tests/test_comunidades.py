@@ -0,0 +1,62 @@
+"""
+Correspondência entre os nomes digitados nas planilhas e as capelas
+cadastradas (normalizar_comunidades). Nome diferente de comunidade
+diferente nunca pode virar uma capela, porque sai impresso na etiqueta.
+"""
+import unittest
+
+from etiquetas import CAPELAS, Etiqueta, normalizar_comunidades, para_dataframe
+
+# Valor da planilha -> capela cadastrada
+CORRESPONDENTES = {
+    "CAP. S. JOSÉ": "CAPELA SÃO JOSÉ",
+    "SAO JOZE": "CAPELA SÃO JOSÉ",
+    "N. SRA DE FATIMA": "CAPELA NOSSA SRA. DE FÁTIMA",
+    "Sta Catarina": "CAPELA SANTA CATARINA",
+    "SANTANA": "CAPELA SANT'ANNA",
+    "SÃO JERONIMO": "CAPELA SÃO JERÔNIMO",
+    "SAO SEBASTIAO MEIO DA SERRA": "CAPELA S. SEBASTIÃO - MEIO DA SERRA",
+}
+
+# Outras comunidades, ou nomes que não dizem qual é a capela
+SEM_CORRESPONDENCIA = [
+    "SANTA", "JESUS", "RUA J", "SAO JOSE OPERARIO",
+    "SAO JORGE II", "SAO JOSE 2", "CAPELA SAO JOSE DO VALE",
+    "SANTA CATARINA NORTE", "SAO JERONIMO ALTO", "NOSSA SRA DE FATIMA II",
+]
+
+
+def registros(valores):
+    return [Etiqueta(f"PESSOA {i}", str(i), valor) for i, valor in enumerate(valores)]
+
+
+class TestNormalizarComunidades(unittest.TestCase):
+
+    def test_corrige_abreviacoes_e_erros_de_digitacao(self):
+        dados, relatorio = normalizar_comunidades(registros(CORRESPONDENTES), CAPELAS)
+        self.assertEqual([e.comunidade for e in dados], list(CORRESPONDENTES.values()))
+        self.assertEqual(relatorio["corrigidas"], CORRESPONDENTES)
+        self.assertEqual(relatorio["sem_correspondencia"], {})
+
+    def test_nao_troca_outras_comunidades(self):
+        dados, relatorio = normalizar_comunidades(registros(SEM_CORRESPONDENCIA), CAPELAS)
+        self.assertEqual([e.comunidade for e in dados], SEM_CORRESPONDENCIA)
+        self.assertEqual(relatorio["corrigidas"], {})
+        self.assertEqual(sorted(relatorio["sem_correspondencia"]), sorted(SEM_CORRESPONDENCIA))
+
+    def test_palavras_a_mais_viram_sugestao(self):
+        _, relatorio = normalizar_comunidades(registros(SEM_CORRESPONDENCIA), CAPELAS)
+        self.assertEqual(relatorio["sugestoes"]["SAO JORGE II"], "CAPELA SÃO JORGE")
+        self.assertEqual(relatorio["sugestoes"]["CAPELA SAO JOSE DO VALE"], "CAPELA SÃO JOSÉ")
+        for valor in ("SANTA", "JESUS", "RUA J"):
+            self.assertNotIn(valor, relatorio["sugestoes"])
+
+    def test_dataframe_igual_a_lista(self):
+        valores = list(CORRESPONDENTES) + SEM_CORRESPONDENCIA
+        lista, relatorio_lista = normalizar_comunidades(registros(valores), CAPELAS)
+        for tipo in ("object", "category"):
+            tabela = para_dataframe(registros(valores))
+            tabela["COMUNIDADE"] = tabela["COMUNIDADE"].astype(tipo)
+            dados, relatorio = normalizar_comunidades(tabela, CAPELAS)
+            self.assertEqual(list(dados["COMUNIDADE"]), [e.comunidade for e in lista])
+            self.assertEqual(relatorio, relatorio_lista)
@@ -0,0 +1,35 @@
+"""
+deduplicar_e_ordenar precisa dar o mesmo resultado para uma lista de
+Etiqueta e para um DataFrame: a GUI usa um, a linha de comando o outro.
+"""
+import unittest
+
+from etiquetas import Etiqueta, deduplicar_e_ordenar, para_dataframe
+
+REGISTROS = [
+    Etiqueta("A", "90000000000000001", "MATRIZ"),
+    Etiqueta("B", "90000000000000000", "MATRIZ"),
+    Etiqueta("C", "12", "MATRIZ"),
+    Etiqueta("D", "012", "MATRIZ"),
+    Etiqueta("E", "9", "MATRIZ"),
+    Etiqueta("F", "X-1", "MATRIZ"),
+    Etiqueta("G", "", "MATRIZ"),
+    Etiqueta("H", "123456789012345678901234567890", "MATRIZ"),
+    Etiqueta("I", "0", "MATRIZ"),
+    Etiqueta("J", "0123456789012345678901234567889", "MATRIZ"),
+]
+
+
+class TestDeduplicarEOrdenar(unittest.TestCase):
+
+    def ordenar(self, dados):
+        dados, _ = deduplicar_e_ordenar(dados, ordem="codigo", deduplicar=False)
+        if hasattr(dados, "columns"):
+            return list(dados["NOME"])
+        return [e.nome for e in dados]
+
+    def test_codigos_grandes_em_ordem_numerica(self):
+        self.assertEqual(self.ordenar(REGISTROS), ["I", "E", "D", "C", "B", "A", "J", "H", "F", "G"])
+
+    def test_dataframe_igual_a_lista(self):
+        self.assertEqual(self.ordenar(para_dataframe(REGISTROS)), self.ordenar(REGISTROS))
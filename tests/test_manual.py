@@ -0,0 +1,18 @@
+"""
+Os erros da entrada manual citam a linha como o editor da interface a
+numera (validar_entrada_manual), contando as linhas em branco.
+"""
+import unittest
+
+from etiquetas import ler_manual
+
+
+class TestLerManual(unittest.TestCase):
+
+    def test_linhas_em_branco_contam_no_numero(self):
+        with self.assertRaisesRegex(Exception, r"^Linha 4: "):
+            ler_manual("\n\n1;ANA;1\n0;BIA;2\n", "MATRIZ")
+
+    def test_quebras_windows(self):
+        dados = ler_manual("1;ANA;1\r\n2;BIA;2\r\n", "MATRIZ")
+        self.assertEqual([(e.nome, e.codigo) for e in dados], [("ANA", "1"), ("BIA", "2")])
@@ -0,0 +1,45 @@
+"""
+O núcleo (etiquetas.py) e as interfaces sem tela (cli.py, servidor.py)
+precisam importar sem o tkinter: rodam em servidores e em processos do
+pool. Cada importação roda em um interpretador novo, com o tkinter
+bloqueado, para não depender do que outros testes já importaram.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+PASTA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importar_sem_tkinter(modulo):
+    """Importa o módulo com sys.modules['tkinter'] = None; retorna os módulos pesados carregados"""
+    codigo = (
+        "import sys; sys.modules['tkinter'] = None; "
+        f"import {modulo}; "
+        "print(' '.join(m for m in ('pandas', 'openpyxl', 'reportlab.pdfgen.canvas') if m in sys.modules))"
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=PASTA, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise AssertionError(f"import {modulo} falhou sem o tkinter:\n{resultado.stderr}")
+    return resultado.stdout.split()
+
+
+class TestImportacaoSemTkinter(unittest.TestCase):
+
+    def test_etiquetas(self):
+        # pandas, openpyxl e o canvas do reportlab só são carregados quando usados
+        self.assertEqual(importar_sem_tkinter("etiquetas"), [])
+
+    def test_cli(self):
+        importar_sem_tkinter("cli")
+
+    def test_servidor(self):
+        importar_sem_tkinter("servidor")
+
+    def test_app_depende_do_tkinter(self):
+        # Confere que o bloqueio funciona: a interface não importa sem ele
+        with self.assertRaises(AssertionError):
+            importar_sem_tkinter("app")
@@ -0,0 +1,96 @@
+"""
+Posições dos textos no PDF comparadas com tests/dados/posicoes_pdf.json.
+Os textos são lidos do próprio arquivo gerado, sem biblioteca extra: cada
+página tem um único fluxo de conteúdo (ASCII85 + Flate, como o reportlab
+grava). Se o layout mudar de propósito, regrave a referência com:
+    python -m tests.test_pdf
+"""
+import base64
+import json
+import os
+import re
+import tempfile
+import unittest
+import zlib
+
+import etiquetas
+from etiquetas import ETIQUETAS_POR_PAGINA, Etiqueta
+
+REFERENCIA = os.path.join(os.path.dirname(__file__), "dados", "posicoes_pdf.json")
+
+# Primeira folha completa, com uma posição vazia; a segunda com duas etiquetas
+REGISTROS = [
+    Etiqueta(f"PESSOA {i:02d} DA SILVA", str(i), "MATRIZ" if i % 2 else "CAPELA SÃO JOSÉ")
+    for i in range(1, ETIQUETAS_POR_PAGINA + 3)
+]
+REGISTROS[4] = Etiqueta("", "", "")
+REGISTROS[7] = Etiqueta("NOME MUITO COMPRIDO PARA CABER EM UMA LINHA SO DE ETIQUETA", "8", "MATRIZ")
+
+_FLUXO = re.compile(rb"stream\r?\n(.*?)endstream", re.S)
+_TEXTO = re.compile(r"([-\d.]+) ([-\d.]+) Tm \(((?:\\.|[^\\)])*)\) Tj")
+_ESCAPE = re.compile(r"\\([0-7]{1,3}|.)")
+
+
+def _texto_pdf(literal):
+    """Desfaz os escapes de uma string literal do PDF (\\ooo, \\(, \\))"""
+    return _ESCAPE.sub(
+        lambda m: chr(int(m.group(1), 8)) if m.group(1).isdigit() else m.group(1), literal
+    )
+
+
+def textos_do_pdf(caminho):
+    """[[x, y, texto], ...] de cada página, na ordem em que foram desenhados"""
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    paginas = []
+    for fluxo in _FLUXO.findall(conteudo):
+        comandos = zlib.decompress(base64.a85decode(fluxo.strip(), adobe=True)).decode("latin-1")
+        paginas.append([
+            [round(float(x), 2), round(float(y), 2), _texto_pdf(texto)]
+            for x, y, texto in _TEXTO.findall(comandos)
+        ])
+    return paginas
+
+
+def gerar_referencia():
+    with tempfile.TemporaryDirectory() as pasta:
+        return textos_do_pdf(etiquetas.gerar_pdf(REGISTROS, os.path.join(pasta, "etiquetas.pdf")))
+
+
+class TestPosicoesPDF(unittest.TestCase):
+
+    def test_igual_a_referencia(self):
+        with open(REFERENCIA, encoding="utf-8") as f:
+            self.assertEqual(gerar_referencia(), json.load(f))
+
+    def test_formularios_nao_mudam_nomes_e_codigos(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = etiquetas.gerar_pdf(
+                REGISTROS, os.path.join(pasta, "etiquetas.pdf"), usar_formularios=True
+            )
+            # A linha da comunidade vai para um formulário (outro fluxo); o resto não muda
+            paginas = [p for p in textos_do_pdf(caminho) if any(t[2].startswith("Nº") for t in p)]
+        self.assertEqual(len(paginas), 2)
+        referencia = [
+            [t for t in p if t[2] not in ("MATRIZ", "CAPELA SÃO JOSÉ")]
+            for p in gerar_referencia()
+        ]
+        self.assertEqual(
+            [[t for t in p if t[2] not in ("MATRIZ", "CAPELA SÃO JOSÉ")] for p in paginas],
+            referencia
+        )
+
+    def test_posicao_vazia_nao_tem_texto(self):
+        primeira = gerar_referencia()[0]
+        self.assertEqual(len([t for t in primeira if t[2].startswith("Nº")]), ETIQUETAS_POR_PAGINA - 1)
+        self.assertNotIn("Nº 5", [t[2] for t in primeira])
+
+
+if __name__ == "__main__":
+    with open(REFERENCIA, "w", encoding="utf-8") as f:
+        # Um texto por linha, para o diff mostrar só o que mudou
+        f.write("[\n" + ",\n".join(
+            " [\n" + ",\n".join("  " + json.dumps(t, ensure_ascii=False) for t in pagina) + "\n ]"
+            for pagina in gerar_referencia()
+        ) + "\n]\n")
+    print(f"Referência gravada em {REFERENCIA}")
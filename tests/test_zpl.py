@@ -0,0 +1,54 @@
+"""
+Saída ZPL comparada com um arquivo de referência (tests/dados/etiquetas.zpl).
+Se o layout mudar de propósito, regrave a referência com:
+    python -m tests.test_zpl
+"""
+import io
+import os
+import unittest
+
+import etiquetas
+from etiquetas import Etiqueta
+
+REFERENCIA = os.path.join(os.path.dirname(__file__), "dados", "etiquetas.zpl")
+
+# Uma folha com posições vazias no meio e nomes com os caracteres que o ZPL
+# trata como comando (^ e ~) ou como escape do ^FH (_)
+REGISTROS = [
+    Etiqueta("JOAO DA SILVA", "12", "MATRIZ"),
+    Etiqueta("", "", ""),
+    Etiqueta("MARIA_DAS DORES", "7", "CAPELA SÃO JOSÉ"),
+    Etiqueta("ANA ^FS~JA", "0099", "CAPELA SANT'ANNA"),
+    Etiqueta("", "", ""),
+    Etiqueta("NOME MUITO COMPRIDO PARA CABER EM UMA LINHA SO DE ETIQUETA", "31", "MATRIZ"),
+]
+
+
+def gerar_referencia():
+    saida = io.BytesIO()
+    etiquetas.gerar_zpl(REGISTROS, saida)
+    return saida.getvalue()
+
+
+class TestZPL(unittest.TestCase):
+
+    def test_igual_a_referencia(self):
+        with open(REFERENCIA, "rb") as f:
+            self.assertEqual(gerar_referencia(), f.read())
+
+    def test_posicoes_vazias_nao_viram_etiqueta(self):
+        zpl = gerar_referencia().decode("utf-8")
+        self.assertEqual(zpl.count("^XA"), 4)
+        self.assertEqual(zpl.count("^XZ"), 4)
+
+    def test_escapa_comandos_no_texto(self):
+        zpl = gerar_referencia().decode("utf-8")
+        self.assertIn("^FDMARIA_5FDAS DORES^FS", zpl)
+        self.assertIn("^FDANA _5EFS_7EJA^FS", zpl)
+        self.assertNotIn("~", zpl)
+
+
+if __name__ == "__main__":
+    with open(REFERENCIA, "wb") as f:
+        f.write(gerar_referencia())
+    print(f"Referência gravada em {REFERENCIA}")